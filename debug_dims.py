@@ -1,5 +1,6 @@
-import cv2
 import os
+import subprocess
+from PIL import Image
 
 base_dir = r"c:\Users\askar\video_narrator\hello_world"
 cursor_path = os.path.join(base_dir, "cursor.png")
@@ -7,20 +8,21 @@ project_root = r"c:\Users\askar\video_narrator"
 video_path = os.path.join(project_root, "demo.mp4")
 
 print(f"Checking {cursor_path}")
-img = cv2.imread(cursor_path)
-if img is None:
+try:
+    # Only the header is read; pixel data is never decoded
+    with Image.open(cursor_path) as img:
+        print(f"cursor.png size: {img.size} mode: {img.mode}")
+except OSError:
     print("Failed to load cursor.png")
-else:
-    print(f"cursor.png shape: {img.shape}")
 
 print(f"Checking {video_path}")
-cap = cv2.VideoCapture(video_path)
-if not cap.isOpened():
+p = subprocess.run(
+    ["ffprobe", "-v", "error", "-select_streams", "v:0",
+     "-show_entries", "stream=width,height", "-of", "csv=p=0", video_path],
+    capture_output=True, text=True
+)
+if p.returncode != 0 or not p.stdout.strip():
     print("Failed to open video")
 else:
-    ret, frame = cap.read()
-    if ret:
-        print(f"Video frame shape: {frame.shape}")
-    else:
-        print("Failed to read video frame")
-    cap.release()
+    width, height = p.stdout.strip().split(",")[:2]
+    print(f"Video frame size: {width}x{height}")
@@ -1,5 +1,6 @@
 import os
 import uuid
+import logging
 from src.infrastructure.google_client import client, creds
 from src.application.pipeline_service import NarrationPipeline
 
@@ -9,6 +10,8 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 if __name__ == "__main__":
+    # Pipeline progress goes through logging; keep the CLI output plain
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "info").upper(), format="%(message)s")
     env = os.getenv("ENV", "local").lower()
     video_uri = os.getenv("VIDEO_URI")
     
@@ -25,6 +28,7 @@ if __name__ == "__main__":
 
     # 2. Preparation (Download)
     # Even in local mode, we need a path. download_video handles exist_ok checks.
+    analysis = pipeline.start_analysis(video_uri)
     local_raw = pipeline.download_video(video_uri)
 
     # 3. Core Pipeline
@@ -38,7 +42,10 @@ if __name__ == "__main__":
         gcs_video_uri=video_uri,
         video_id=test_video_id,
         user_id=test_user_id,
-        use_case=use_case
+        use_case=use_case,
+        user_ip=os.getenv("USER_IP", "0.0.0.0"),
+        user_country=os.getenv("USER_COUNTRY", "unknown"),
+        analysis=analysis
     )
 
 
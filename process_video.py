@@ -1,8 +1,11 @@
 import os
-from src.infrastructure.storage_service import download_file, upload_file
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from src.infrastructure.storage_service import download_file, upload_file, generate_signed_url, drop_page_cache, copy_file
 from src.application.video_service import VideoService
 from urllib.parse import urlparse
 
+@lru_cache(maxsize=1024)
 def parse_public_uri(uri):
     """
     Parses a public GCS URL to extract bucket and blob name.
@@ -32,18 +35,32 @@ def run_trim_workflow(video_uri):
         print("❌ Invalid Public URI")
         return
 
-    # 1. Download
-    local_input = os.path.join("temp", os.path.basename(blob_name))
-    download_file(bucket_name, blob_name, local_input)
+    # 1. Source: let ffmpeg read straight from GCS, only download if signing fails
+    source_input = generate_signed_url(bucket_name, blob_name)
+    if not source_input:
+        source_input = os.path.join("temp", os.path.basename(blob_name))
+        download_file(bucket_name, blob_name, source_input)
 
     # 2. Trim
     local_output = os.path.join("temp", f"trimmed_{os.path.basename(blob_name)}")
+    os.makedirs("temp", exist_ok=True)
     video_service = VideoService()
-    video_service.fast_trim(local_input, local_output)
+    # Probing the source is a network round-trip independent of the trim, so run it alongside
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        source_duration_future = pool.submit(video_service.get_duration, source_input)
+        video_service.fast_trim(source_input, local_output)
+        source_duration = source_duration_future.result()
 
     # 3. Upload
     destination_blob = f"trimmed/{blob_name}"
-    public_url = upload_file(bucket_name, local_output, destination_blob)
+    if abs(video_service.get_duration(local_output) - source_duration) < 0.05:
+        # Nothing was cut: copy the original object server-side instead of re-uploading
+        public_url = copy_file(bucket_name, blob_name, destination_blob)
+    else:
+        public_url = upload_file(bucket_name, local_output, destination_blob)
+    if source_input and os.path.exists(source_input):
+        # Fallback local copy is done with; keep it out of the page cache
+        drop_page_cache(source_input)
     
     print(f"✨ Workflow Complete! Processed video at: {public_url}")
 
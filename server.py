@@ -1,10 +1,26 @@
 import os
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from src.api.v1.endpoints.videos import router as video_router
 from src.api.v1.endpoints.audio import router as audio_router
 
-app = FastAPI(title="Breeo Backend API")
+# Request threads only enqueue log records; a listener thread does the stderr writes
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "warning").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    handlers=[QueueHandler(_log_queue)]
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+app = FastAPI(title="Breeo Backend API", default_response_class=ORJSONResponse)
 
 # Setup CORS
 app.add_middleware(
@@ -25,4 +41,18 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from src.config import REDIS_URL
+    # Without Redis, pipelines run in each worker's own executor, so extra workers
+    # would multiply PIPELINE_MAX_CONCURRENCY (and ffmpeg threads); default to one
+    default_workers = (os.cpu_count() or 1) if REDIS_URL else 1
+    # "auto" picks uvloop/httptools when installed (uvicorn[standard]) and falls
+    # back to asyncio/h11 elsewhere, e.g. on Windows where uvloop is unavailable.
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", str(default_workers))),
+        loop="auto",
+        http="auto",
+        log_level=os.getenv("LOG_LEVEL", "warning").lower()
+    )
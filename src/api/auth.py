@@ -1,6 +1,43 @@
+import os
+import time
+import logging
+import hashlib
+import jwt
 from fastapi import Header, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from src.infrastructure.supabase_client import supabase
 
+logger = logging.getLogger(__name__)
+
+# When set, token signatures are checked locally before any network call
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+
+# Validated users keyed by token hash: {hash: (expires_at, user)}
+USER_CACHE_TTL = 300
+USER_CACHE_MAX_SIZE = 4096
+_user_cache = {}
+
+def _token_expiry(token: str) -> float:
+    """
+    Returns the token's exp claim. The signature is verified when the project
+    JWT secret is configured; otherwise Supabase verifies it on cache miss.
+    """
+    if SUPABASE_JWT_SECRET:
+        claims = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"], audience="authenticated")
+    else:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    return float(claims.get("exp", 0))
+
+def _cache_user(key: str, user, token_exp: float):
+    now = time.time()
+    if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+        for k in [k for k, (exp, _) in _user_cache.items() if exp <= now]:
+            del _user_cache[k]
+        if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+            # Still full: drop the oldest entry
+            del _user_cache[next(iter(_user_cache))]
+    _user_cache[key] = (min(now + USER_CACHE_TTL, token_exp), user)
+
 async def get_current_user(authorization: str = Header(...)):
     """
     Validates the Supabase JWT token and returns the user object.
@@ -8,21 +45,35 @@ async def get_current_user(authorization: str = Header(...)):
     """
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header")
-    
+
     token = authorization.split(" ")[1]
-    print(f"DEBUG: Validating token starting with: {token[:20]}...")
-    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Validating token prefix=%s", token[:8])
+
+    try:
+        token_exp = _token_expiry(token)
+    except jwt.PyJWTError as e:
+        logger.warning("Auth error: local token validation failed: %s", e)
+        raise HTTPException(status_code=401, detail=f"Unauthenticated: {str(e)}")
+
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _user_cache.get(cache_key)
+    if cached and cached[0] > time.time():
+        return cached[1]
+
     try:
         # Verify the token with Supabase
         # Note: res is a UserResponse object in recent versions
-        res = supabase.auth.get_user(token)
+        # The client is synchronous; keep the event loop free during the RPC
+        res = await run_in_threadpool(supabase.auth.get_user, token)
         if not res.user:
-            print("Auth error: No user returned from Supabase")
+            logger.warning("Auth error: No user returned from Supabase")
             raise HTTPException(status_code=401, detail="Invalid or expired token")
+        _cache_user(cache_key, res.user, token_exp)
         return res.user
     except Exception as e:
-        print(f"Auth error exception: {type(e).__name__}: {str(e)}")
+        logger.warning("Auth error exception: %s: %s", type(e).__name__, e)
         # Log more info if it's a supabase-py specific error
         if hasattr(e, 'message'):
-            print(f"Supabase error message: {e.message}")
+            logger.warning("Supabase error message: %s", e.message)
         raise HTTPException(status_code=401, detail=f"Unauthenticated: {str(e)}")
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
+import asyncio
 import traceback
 
 from src.api.auth import get_current_user
 from src.application.use_cases.sync_timeline import SyncTimelineUseCase
-from src.infrastructure.repositories.supabase_video_repository import SupabaseVideoRepository
+from src.infrastructure.repositories.supabase_video_repository import get_video_repository
 from src.api.v1.schemas.video import BatchAudioEditRequest
 from src.infrastructure.google_client import creds
 
 router = APIRouter(prefix="/audio", tags=["Audio"])
 
 def sync_timeline_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return SyncTimelineUseCase(repo)
 
  
@@ -21,7 +22,8 @@ async def batch_audio_edit(
     use_case: SyncTimelineUseCase = Depends(sync_timeline_use_case)
 ):
     try:
-        result = use_case.execute_batch(
+        result = await asyncio.to_thread(
+            use_case.execute_batch,
             video_id=request.video_id,
             user_id=user.id,
             updates=[u.dict() for u in request.updates],
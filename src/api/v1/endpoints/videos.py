@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Body
+from fastapi.responses import ORJSONResponse
 from typing import Optional, Dict, Any
-import os
-import traceback
+import logging
 
 from src.api.auth import get_current_user
 from src.application.use_cases.get_video import GetVideoByIdUseCase
@@ -10,142 +10,181 @@ from src.application.use_cases.create_video import CreateVideoUseCase
 from src.application.use_cases.update_video_config import UpdateVideoConfigUseCase
 from src.application.use_cases.update_video_title import UpdateVideoTitleUseCase
 from src.application.use_cases.update_video_guide import UpdateVideoGuideUseCase
-from src.infrastructure.repositories.supabase_video_repository import SupabaseVideoRepository
+from src.infrastructure.repositories.supabase_video_repository import get_video_repository
 from src.application.pipeline_service import NarrationPipeline
 from src.application.document_service import DocumentGenerationService
+from src.application.export_progress import ExportJobTracker
 from src.infrastructure.google_client import client, creds
 from src.api.v1.schemas.video import UploadCompleteRequest
 from src.domain.entities.video_export import VideoExportStatus, VideoExportJob
-from src.infrastructure.repositories.supabase_video_export_repository import SupabaseVideoExportRepository
-from src.config import PROJECT_ROOT
+from src.infrastructure.repositories.supabase_video_export_repository import SupabaseVideoExportRepository, get_video_export_repository
+from src.config import PROJECT_ROOT, REDIS_URL, PIPELINE_MAX_CONCURRENCY
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/videos", tags=["Videos"])
 
 # Wire up the dependencies
 def get_video_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return GetVideoByIdUseCase(repo)
 
 def list_videos_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return ListVideosUseCase(repo)
 
 def create_video_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return CreateVideoUseCase(repo)
 
 def update_config_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return UpdateVideoConfigUseCase(repo)
 
 def update_title_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return UpdateVideoTitleUseCase(repo)
 
 def update_guide_use_case():
-    repo = SupabaseVideoRepository()
+    repo = get_video_repository()
     return UpdateVideoGuideUseCase(repo)
 
 def get_export_repo():
-    return SupabaseVideoExportRepository()
+    return get_video_export_repository()
 
 
 
-def run_pipeline_background(video_id: str, video_uri: str, user_id: str, title: str, user_ip: str = "0.0.0.0", user_country: str = "unknown"):
+async def run_pipeline_background(video_id: str, video_uri: str, user_id: str, title: str, user_ip: str = "0.0.0.0", user_country: str = "unknown"):
     """
     Background task to execute the video processing pipeline.
+    Blocking transfer/processing steps run on the shared pipeline pool so the
+    event loop stays free to serve requests.
     """
     try:
-        # Set environment variables for the pipeline to consume
-        os.environ["VIDEO_URI"] = video_uri
-        os.environ["USER_IP"] = user_ip
-        os.environ["USER_COUNTRY"] = user_country
-        repo = SupabaseVideoRepository()
+        repo = get_video_repository()
         use_case = CreateVideoUseCase(repo)
         pipeline = NarrationPipeline(gemini_client=client, tts_creds=creds, base_dir=PROJECT_ROOT)
 
 
-        # 1. Preparation (Download)
-        os.environ["VIDEO_URI"] = video_uri
-        local_raw = pipeline.download_video(video_uri)
+        def process():
+            # Gemini reads the video from GCS itself, so scripting starts while we download
+            analysis = pipeline.start_analysis(video_uri)
 
-        # 2. Core Pipeline - Now handles DB updates internally
-        results = pipeline.run(
-            local_raw_path=local_raw, 
-            gcs_video_uri=video_uri,
-            video_id=video_id,
-            user_id=user_id,
-            title=title,
-            video_uri=video_uri,
-            use_case=use_case
-        )
+            # 1. Preparation (Download)
+            local_raw = pipeline.download_video(video_uri)
+
+            # 2. Core Pipeline - Now handles DB updates internally
+            return pipeline.run(
+                local_raw_path=local_raw,
+                gcs_video_uri=video_uri,
+                video_id=video_id,
+                user_id=user_id,
+                title=title,
+                video_uri=video_uri,
+                use_case=use_case,
+                user_ip=user_ip,
+                user_country=user_country,
+                analysis=analysis
+            )
+
+        # Bounded pool: at most PIPELINE_MAX_CONCURRENCY videos process at once
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(pipeline_executor, process)
 
         if not results:
-             print(f"Pipeline processing failed for video {video_id}")
-             repo.update(video_id, status="failed")
+             logger.error("Pipeline processing failed for video %s", video_id)
+             await asyncio.to_thread(repo.update, video_id, status="failed")
              return
 
-        print(f"Background processing complete for video {video_id}")
+        logger.info("Background processing complete for video %s", video_id)
 
 
-    except Exception as e:
-        print(f"Background Processing Error for {video_id}: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Background Processing Error for %s", video_id)
         try:
-            repo = SupabaseVideoRepository()
-            repo.update(video_id, status="failed")
+            repo = get_video_repository()
+            await asyncio.to_thread(repo.update, video_id, status="failed")
         except:
             pass
 
+# Shared across jobs; ffmpeg itself is sized via FFMPEG_THREADS so parallel jobs don't thrash
+pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_MAX_CONCURRENCY, thread_name_prefix="pipeline")
+
+# Strong references to in-flight pipeline tasks so they aren't garbage collected
+_pipeline_jobs = set()
+
+def submit_pipeline_job(*job_args):
+    """
+    Schedules a pipeline run on the shared pool without tying it to the
+    request/response cycle the way BackgroundTasks does.
+    """
+    task = asyncio.create_task(run_pipeline_background(*job_args))
+    _pipeline_jobs.add(task)
+    task.add_done_callback(_pipeline_jobs.discard)
+    return task
+
+_job_queue = None
+
+async def get_job_queue():
+    """
+    Returns the arq Redis pool used to hand pipeline jobs to worker processes,
+    or None when no REDIS_URL is configured (jobs then run in-process).
+    """
+    global _job_queue
+    if REDIS_URL and _job_queue is None:
+        from arq import create_pool
+        from arq.connections import RedisSettings
+        _job_queue = await create_pool(RedisSettings.from_dsn(REDIS_URL))
+    return _job_queue
+
 async def simulate_export_process(job_id: str, video_id: str, repo: SupabaseVideoExportRepository):
     """
-    Simulates a video export process by updating status and progress over time.
+    Simulates a video export process by pushing stage transitions to the job
+    tracker as they happen; the tracker coalesces them into DB writes.
     """
+    tracker = ExportJobTracker(job_id, repo)
     try:
-        # 0. Initial State
-        video_repo = SupabaseVideoRepository()
-        video_repo.update(video_id, download_ready=False)
+        # 0. Initial State (start_export already reset download_ready)
+        video_repo = get_video_repository()
 
         # 1. Processing Stage
-        await asyncio.sleep(2)
-        repo.update(job_id, status=VideoExportStatus.PROCESSING, progress_percent=10, stage="Analyzing sequence...")
-        
-        await asyncio.sleep(3)
-        repo.update(job_id, progress_percent=35, stage="Rendering frames...")
-        
-        await asyncio.sleep(4)
-        repo.update(job_id, progress_percent=65, stage="Encoding video...")
+        tracker.update(status=VideoExportStatus.PROCESSING, progress_percent=10, stage="Analyzing sequence...")
+        # Yield so the flusher writes the first stage right away (leading edge)
+        await asyncio.sleep(0)
+        tracker.update(progress_percent=35, stage="Rendering frames...")
+        tracker.update(progress_percent=65, stage="Encoding video...")
 
         # 2. Uploading Stage
-        await asyncio.sleep(2)
-        repo.update(job_id, status=VideoExportStatus.UPLOADING, progress_percent=80, stage="Uploading to cloud storage...")
+        tracker.update(status=VideoExportStatus.UPLOADING, progress_percent=80, stage="Uploading to cloud storage...")
+        await asyncio.sleep(0)
 
         # 3. Finalizing Stage
-        await asyncio.sleep(2)
-        repo.update(job_id, status=VideoExportStatus.FINALIZING, progress_percent=95, stage="Optimizing for web playback...")
+        tracker.update(status=VideoExportStatus.FINALIZING, progress_percent=95, stage="Optimizing for web playback...")
+        await asyncio.sleep(0)
 
         # 4. Completed
-        await asyncio.sleep(1)
         # Simulation output URL
         output_url = "https://storage.googleapis.com/evalsy-storage/2025-12-23%2010-18-18.mp4"
-        repo.update(job_id, status=VideoExportStatus.COMPLETED, progress_percent=100, stage="Export complete", output_url=output_url)
-        
+        tracker.update(status=VideoExportStatus.COMPLETED, progress_percent=100, stage="Export complete", output_url=output_url)
+        await tracker.close()
+
         # Update main video record
-        video_repo = SupabaseVideoRepository()
-        v_ent = video_repo.get_by_id(video_id)
+        v_ent = await asyncio.to_thread(video_repo.get_by_id, video_id)
         if v_ent:
             v_data = v_ent.video_data or {}
             v_data["last_export_url"] = output_url
-            video_repo.update(video_id, download_ready=True, video_data=v_data)
+            await asyncio.to_thread(video_repo.update, video_id, existing_video=v_ent, download_ready=True, video_data=v_data)
         else:
-            video_repo.update(video_id, download_ready=True)
+            await asyncio.to_thread(video_repo.update, video_id, download_ready=True)
 
-        print(f"🎬 Simulated Export Job {job_id} COMPLETED for video {video_id}.")
+        logger.info("🎬 Simulated Export Job %s COMPLETED for video %s.", job_id, video_id)
 
     except Exception as e:
-        print(f"❌ Export Simulation Error: {e}")
-        repo.update(job_id, status=VideoExportStatus.FAILED, error_message=str(e))
+        logger.exception("Export Simulation Error for job %s", job_id)
+        tracker.cancel()
+        await asyncio.to_thread(repo.update, job_id, status=VideoExportStatus.FAILED, error_message=str(e))
 
 @router.get("/")
 async def list_videos(
@@ -153,9 +192,10 @@ async def list_videos(
     use_case: ListVideosUseCase = Depends(list_videos_use_case)
 ):
     try:
-        return use_case.execute(user.id)
+        # Plain dict rows: serialize directly and skip jsonable_encoder
+        return ORJSONResponse(await asyncio.to_thread(use_case.execute, user.id))
     except Exception as e:
-        print(f"API Error: {e}")
+        logger.error("API Error: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{video_id}")
@@ -165,20 +205,19 @@ async def get_video(
     use_case: GetVideoByIdUseCase = Depends(get_video_use_case)
 ):
     try:
-        video = use_case.execute(video_id, user.id)
+        video = await asyncio.to_thread(use_case.execute, video_id, user.id)
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         return video
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
     except Exception as e:
-        print(f"API Error: {e}")
+        logger.error("API Error: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/upload_complete")
 async def upload_complete(
     request: UploadCompleteRequest, 
-    background_tasks: BackgroundTasks,
     user=Depends(get_current_user),
     use_case: CreateVideoUseCase = Depends(create_video_use_case)
 ):
@@ -191,7 +230,8 @@ async def upload_complete(
             "user_country": request.user_country
         }
         
-        use_case.execute(
+        await asyncio.to_thread(
+            use_case.execute,
             user_id=user.id,
             video_id=request.video_id,
             title=request.title,
@@ -199,16 +239,20 @@ async def upload_complete(
             metadata=metadata
         )
 
-        # Trigger heavy processing in the background
-        background_tasks.add_task(
-            run_pipeline_background, 
-            request.video_id, 
-            request.video_uri, 
-            user.id, 
+        # Trigger heavy processing on a worker (or the in-process pipeline pool as a fallback)
+        job_args = (
+            request.video_id,
+            request.video_uri,
+            user.id,
             request.title,
             request.user_ip,
             request.user_country
         )
+        job_queue = await get_job_queue()
+        if job_queue:
+            await job_queue.enqueue_job("run_pipeline", *job_args)
+        else:
+            submit_pipeline_job(*job_args)
 
         return {
             "status": "processing",
@@ -217,8 +261,7 @@ async def upload_complete(
         }
 
     except Exception as e:
-        print(f"Upload Complete Error: {e}")
-        traceback.print_exc()
+        logger.exception("Upload Complete Error")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -239,16 +282,15 @@ async def update_video_settings(
         if not config:
             raise HTTPException(status_code=400, detail="No config data provided")
             
-        use_case.execute(video_id, user.id, config)
+        await asyncio.to_thread(use_case.execute, video_id, user.id, config)
         return {"status": "success"}
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
-    except Exception as e:
-        print(f"Update Config API Error: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Update Config API Error")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.patch("/{video_id}/title")
@@ -266,16 +308,15 @@ async def update_video_title(
         if not title:
             raise HTTPException(status_code=400, detail="No title provided")
             
-        use_case.execute(video_id, user.id, title)
+        await asyncio.to_thread(use_case.execute, video_id, user.id, title)
         return {"status": "success", "title": title}
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
-    except Exception as e:
-        print(f"Update Title API Error: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Update Title API Error")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/{video_id}/generate-doc")
@@ -287,17 +328,17 @@ async def generate_document(
     Generate step-by-step documentation (screenshots) from the video script.
     """
     try:
-        repo = SupabaseVideoRepository()
+        repo = get_video_repository()
         
         # Verify ownership
-        video = repo.get_by_id(video_id)
+        video = await asyncio.to_thread(repo.get_by_id, video_id)
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         if video.created_by != user.id:
             raise HTTPException(status_code=403, detail="Unauthorized")
 
         service = DocumentGenerationService(repo, client)
-        doc_data = service.generate_guide(video_id)
+        doc_data = await asyncio.to_thread(service.generate_guide, video_id, video=video)
         
         return {
             "status": "success",
@@ -306,8 +347,7 @@ async def generate_document(
         }
 
     except Exception as e:
-        print(f"Generate Document Error: {e}")
-        traceback.print_exc()
+        logger.exception("Generate Document Error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.patch("/{video_id}/guide")
@@ -324,16 +364,15 @@ async def update_video_guide(
         if not guide_data:
             raise HTTPException(status_code=400, detail="No guide data provided")
             
-        result = use_case.execute(video_id, user.id, guide_data)
+        result = await asyncio.to_thread(use_case.execute, video_id, user.id, guide_data)
         return {"status": "success", "data": result}
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PermissionError as e:
         raise HTTPException(status_code=403, detail=str(e))
-    except Exception as e:
-        print(f"Update Guide API Error: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Update Guide API Error")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/{video_id}/export")
@@ -348,8 +387,8 @@ async def start_export(
     """
     try:
         # 1. Verify video exists and is owned by user
-        video_repo = SupabaseVideoRepository()
-        video = video_repo.get_by_id(video_id)
+        video_repo = get_video_repository()
+        video = await asyncio.to_thread(video_repo.get_by_id, video_id)
         if not video:
             raise HTTPException(status_code=404, detail="Video not found")
         if video.created_by != user.id:
@@ -364,10 +403,10 @@ async def start_export(
             progress_percent=0,
             stage="Queuing job..."
         )
-        created_job = repo.create(job)
+        created_job = await asyncio.to_thread(repo.create, job)
         
         # Reset download_ready immediately for the UI
-        video_repo.update(video_id, download_ready=False)
+        await asyncio.to_thread(video_repo.update, video_id, download_ready=False)
 
         # 3. Trigger simulation in background
         background_tasks.add_task(simulate_export_process, created_job.id, video_id, repo)
@@ -380,8 +419,7 @@ async def start_export(
 
     except HTTPException: raise
     except Exception as e:
-        print(f"Export Start Error: {e}")
-        traceback.print_exc()
+        logger.exception("Export Start Error")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{video_id}/export/status")
@@ -394,7 +432,7 @@ async def get_export_status(
     Gets the latest export job for a video.
     """
     try:
-        jobs = repo.get_by_video_id(video_id)
+        jobs = await asyncio.to_thread(repo.get_by_video_id, video_id)
         if not jobs:
             return {"status": "none", "job": None}
             
@@ -403,7 +441,7 @@ async def get_export_status(
             "job": jobs[0] # Return the most recent one
         }
     except Exception as e:
-        print(f"Export Status Error: {e}")
+        logger.error("Export Status Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1,7 +1,18 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Any
 
+__all__ = [
+    "UploadCompleteRequest",
+    "TimelineItem",
+    "TimelineUpdateRequest",
+    "ScriptUpdate",
+    "BatchAudioEditRequest",
+]
+
 class UploadCompleteRequest(BaseModel):
+    # Unknown client fields are dropped rather than validated or stored
+    model_config = ConfigDict(extra="ignore", validate_assignment=False, str_strip_whitespace=False)
+
     video_uri: str
     video_id: str
     title: str = "Untitled Video"
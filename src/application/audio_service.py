@@ -1,6 +1,10 @@
 import os
+import json
 import subprocess
 import shutil
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from src.config import PROBE_MAX_WORKERS
 
 class AudioService:
     def __init__(self):
@@ -21,22 +25,47 @@ class AudioService:
         ])
         return output_path
 
+    def get_audio_format(self, path):
+        """Returns (codec_name, sample_rate, channels) of the first audio stream."""
+        out, _ = self.run_cmd([
+            "ffprobe", "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name,sample_rate,channels",
+            "-of", "json", str(path)
+        ])
+        streams = json.loads(out).get("streams") or [{}]
+        s = streams[0]
+        return s.get("codec_name"), s.get("sample_rate"), s.get("channels")
+
+    def can_stream_copy(self, audio_files):
+        """True when every input is MP3 with identical sample rate and channel layout."""
+        paths = list(dict.fromkeys(a['filename'] for a in audio_files))
+        if not paths:
+            return False
+        # One ffprobe per distinct file, run side by side; they are startup-bound
+        with ThreadPoolExecutor(max_workers=min(PROBE_MAX_WORKERS, len(paths))) as executor:
+            formats = set(executor.map(self.get_audio_format, paths))
+        return len(formats) == 1 and next(iter(formats))[0] == "mp3"
+
     def concat_audio_files(self, audio_files, output_path, temp_dir):
         """
         Concatenates multiple audio files into a single MP3.
         audio_files: list of dicts with {'filename': path}
         """
         audio_list_path = os.path.join(temp_dir, "audio_list.txt")
-        
-        with open(audio_list_path, "w") as f:
-            for a in audio_files:
-                # Ensure we use forward slashes for ffmpeg concat filter on Windows
-                abs_path = os.path.abspath(a['filename']).replace('\\', '/')
-                f.write(f"file '{abs_path}'\n")
+
+        # Build the list in memory and write it once; as_posix() gives the
+        # forward slashes ffmpeg's concat demuxer needs on Windows
+        Path(audio_list_path).write_text("".join(
+            [f"file '{Path(a['filename']).resolve().as_posix()}'\n" for a in audio_files]
+        ), encoding="utf-8")
+
+        # Uniform MP3 inputs (the TTS output) can be joined without decoding
+        codec_args = ["-c", "copy"] if self.can_stream_copy(audio_files) else ["-acodec", "libmp3lame"]
 
         self.run_cmd([
             "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
-            "-i", audio_list_path, "-acodec", "libmp3lame", output_path
+            "-i", audio_list_path, *codec_args, output_path
         ])
         
         return output_path
@@ -1,15 +1,83 @@
 import os
 import shutil
+import logging
+import hashlib
+import bisect
 import tempfile
 import datetime
 from pathlib import Path
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional
 from src.application.video_service import VideoService
-from src.infrastructure.storage_service import upload_file
+from src.infrastructure.storage_service import upload_file, download_file, parse_gcs_uri, generate_signed_url, upload_text, download_text, public_url_for
+from src.config import GCS_UPLOAD_WORKERS, GCS_WRITE_BUFFER_SIZE, GUIDE_SCENE_SNAP, GUIDE_SCENE_THRESHOLD
+from src.domain.entities.video import Video
 from src.domain.repositories.video_repository import VideoRepository
 
 from google.genai import types
-import json
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Shared keep-alive session for pulling non-GCS videos, reused across guide runs
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+))
+
+# Static guide instructions, sent as the system instruction; only the title and
+# step data vary per call
+_GUIDE_SYSTEM_INSTRUCTION = """**STYLE GUIDELINES:**
+1. **SPACING:** Use TWO full newlines (Double Enter) between every single element (Title, Intro, Steps, Headers, Paragraphs, Images). This is critical for readability.
+2. **TITLE:** Start with exactly one `# Heading 1`.
+3. **INTRODUCTION:** Immediately after the title, write a 2-sentence professional introduction in a blockquote (`> Discover how to...`).
+4. **STEPS:** For each step:
+   - Use `## Step X: [Action Name]` as the header.
+   - Use 2-3 sentences of clear instructional text.
+   - Place each of the step's `screenshot_urls` on its own line: `![Screenshot](URL)`
+5. **STRUCTURE:** Each step MUST be separated from the previous one by multiple newlines.
+6. **TONE:** Professional and instructional.
+
+**OUTPUT:** Return ONLY the Markdown content. Do not include ```markdown code block wrappers."""
+
+# Screenshots are written, uploaded and deleted within one request; keep them in
+# RAM-backed tmpfs when there is comfortable headroom
+_SHM_DIR = "/dev/shm"
+_SHM_MIN_FREE = 256 * 1024 * 1024
+
+def _frame_scratch_root():
+    try:
+        if os.path.isdir(_SHM_DIR) and shutil.disk_usage(_SHM_DIR).free > _SHM_MIN_FREE:
+            return _SHM_DIR
+    except OSError:
+        pass
+    return None
+
+_GUIDE_MODEL = "gemini-2.0-flash-001"
+_GUIDE_TEMPERATURE = 0.2
+# Part of the guide cache key, so editing the instructions invalidates cached guides
+_GUIDE_PROMPT_HASH = hashlib.sha256(_GUIDE_SYSTEM_INSTRUCTION.encode()).hexdigest()
+
+# Segment fields that feed the screenshots and the generated Markdown
+_GUIDE_HASH_FIELDS = ("id", "voiceover_text", "user_action", "ui_element", "narration_start", "audio_duration")
+
+def _guide_hash(script, video_url, title):
+    """
+    Stable content hash of everything the guide is built from, so an unchanged
+    script can reuse the stored documentation instead of re-running the LLM.
+    """
+    segments = [
+        {k: s.get(k) for k in _GUIDE_HASH_FIELDS}
+        for s in script
+        if not (s.get("is_deleted") or s.get("isDeleted"))
+    ]
+    payload = orjson.dumps([video_url, title, segments], option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(payload).hexdigest()
 
 class DocumentGenerationService:
     def __init__(self, video_repo: VideoRepository, gemini_client: Any = None):
@@ -17,95 +85,140 @@ class DocumentGenerationService:
         self.video_service = VideoService()
         self.client = gemini_client
 
-    def generate_ai_markdown_guide(self, video_id: str, steps: list[dict]):
+    def generate_ai_markdown_guide(self, video_id: str, steps: list[dict], title: Optional[str] = None):
         """
         Uses Gemini to generate a polished Markdown document from the captured steps.
         """
         if not self.client:
-            print("⚠️ No AI client available. Skipping AI refinement.")
+            logger.warning("⚠️ No AI client available. Skipping AI refinement.")
             return ""
 
-        video = self.video_repo.get_by_id(video_id)
-        title = video.title or "Tutorial Guide"
+        if title is None:
+            video = self.video_repo.get_by_id(video_id)
+            title = video.title if video else None
+        title = title or "Tutorial Guide"
         
-        # Prepare context for AI
+        # Prepare context for AI; steps are already in order, so the list position
+        # stands in for an explicit "order" field. Consecutive steps on the same UI
+        # element with the same action are merged into one step with several screenshots.
         steps_context = []
         for s in steps:
+            prev = steps_context[-1] if steps_context else None
+            if prev and prev["title"] == s["title"] and prev["action"] == s["action"]:
+                prev["screenshot_urls"].append(s["screenshot_url"])
+                if s["voiceover_text"]:
+                    prev["voiceover_text"] = f'{prev["voiceover_text"]} {s["voiceover_text"]}'.strip()
+                continue
             steps_context.append({
-                "order": s["order"],
                 "title": s["title"],
                 "action": s["action"],
                 "voiceover_text": s["voiceover_text"],
-                "screenshot_url": s["screenshot_url"]
+                "screenshot_urls": [s["screenshot_url"]]
             })
 
-        prompt = f"""
-        **TASK:** Create a professional, polished step-by-step user guide in Markdown format.
-        **PRODUCT:** {title}
-
-        **STYLE GUIDELINES:**
-        1. **SPACING:** Use TWO full newlines (Double Enter) between every single element (Title, Intro, Steps, Headers, Paragraphs, Images). This is critical for readability.
-        2. **TITLE:** Start with exactly one `# Heading 1`.
-        3. **INTRODUCTION:** Immediately after the title, write a 2-sentence professional introduction in a blockquote (`> Discover how to...`).
-        4. **STEPS:** For each step:
-           - Use `## Step X: [Action Name]` as the header.
-           - Use 2-3 sentences of clear instructional text.
-           - Place the image on its own line: `![Screenshot](URL)`
-        5. **STRUCTURE:** Each step MUST be separated from the previous one by multiple newlines.
-        6. **TONE:** Professional and instructional.
-
-        **DATA (JSON format):**
-        {json.dumps(steps_context, indent=2)}
-
-        **OUTPUT:** Return ONLY the Markdown content. Do not include ```markdown code block wrappers.
-        """
+        prompt_head = f"**TASK:** Create a professional, polished step-by-step user guide in Markdown format.\n**PRODUCT:** {title}\n"
+
+        # Identical inputs give the same guide: serve repeats from the GCS cache.
+        # The key covers the full prompt (instructions and task line), not just the data.
+        bucket_name = os.getenv("GCS_BUCKET_NAME", "evalsy-storage")
+        cache_key = hashlib.sha256(orjson.dumps(
+            {
+                "model": _GUIDE_MODEL,
+                "temperature": _GUIDE_TEMPERATURE,
+                "instructions": _GUIDE_PROMPT_HASH,
+                "prompt": prompt_head,
+                "steps": steps_context
+            },
+            option=orjson.OPT_SORT_KEYS
+        )).hexdigest()
+        cache_blob = f"gemini_cache/{cache_key}.md"
+        cached_markdown = download_text(bucket_name, cache_blob)
+        if cached_markdown:
+            logger.info("♻️ AI Refinement: Reusing cached guide for %s", video_id)
+            return cached_markdown
+
+        steps_json = orjson.dumps(steps_context).decode()
+
+        gen_config = types.GenerateContentConfig(temperature=_GUIDE_TEMPERATURE, system_instruction=_GUIDE_SYSTEM_INSTRUCTION)
 
         try:
-            print(f"🪄 AI Refinement: Generating perfect guideline for {video_id}...")
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-001",
-                contents=[prompt],
-                config=types.GenerateContentConfig(
-                    temperature=0.2,
-                )
+            logger.info("🪄 AI Refinement: Generating perfect guideline for %s...", video_id)
+            # Stream the response so chunks are consumed as they arrive rather than
+            # after the whole guide has been generated
+            stream = self.client.models.generate_content_stream(
+                model=_GUIDE_MODEL,
+                contents=[prompt_head, "**DATA (JSON format):**", steps_json],
+                config=gen_config
             )
             
-            markdown = response.text.strip()
+            markdown = "".join([chunk.text for chunk in stream if chunk.text]).strip()
             # Basic cleanup if AI adds ```markdown code blocks
             if markdown.startswith("```markdown"):
                 markdown = markdown.replace("```markdown", "", 1).rstrip("```")
             elif markdown.startswith("```"):
                 markdown = markdown.replace("```", "", 1).rstrip("```")
-            
-            return markdown.strip()
+
+            markdown = markdown.strip()
+            if markdown:
+                upload_text(bucket_name, markdown, cache_blob, content_type="text/markdown; charset=utf-8")
+            return markdown
 
         except Exception as e:
-            print(f"❌ AI Guide Generation Error: {e}")
+            logger.error("❌ AI Guide Generation Error: %s", e)
             return ""
 
-    def generate_guide(self, video_id: str):
-        video = self.video_repo.get_by_id(video_id)
+    def generate_guide(self, video_id: str, video: Optional[Video] = None):
+        """
+        Pass an already-fetched 'video' to save a database round-trip.
+        """
+        video = video or self.video_repo.get_by_id(video_id)
         if not video:
             raise ValueError(f"Video {video_id} not found")
 
-        video_url = video.video_data.get("processed_video_url")
+        video_data = video.video_data or {}
+        video_url = video_data.get("processed_video_url")
         if not video_url:
             raise ValueError("Video has not been processed yet (no video_url)")
 
-        script = video.video_data.get("script", [])
+        script = video_data.get("script") or []
         bucket_name = os.getenv("GCS_BUCKET_NAME", "evalsy-storage")
         
-        documentation_steps = []
-        
         # 1. Load existing images to reuse
         existing_doc = video.documentation or {}
         image_library = existing_doc.get("images", {})
-        
-        tmp_dir = Path(tempfile.mkdtemp(prefix="doc_gen_"))
+
+        active_ids = [seg.get("id") for seg in script if not (seg.get("is_deleted") or seg.get("isDeleted"))]
+
+        # Nothing changed since the last run and every step got its screenshot:
+        # the stored guide is still current
+        script_hash = _guide_hash(script, video_url, video.title)
+        if (existing_doc.get("script_hash") == script_hash and existing_doc.get("markdown")
+                and all(seg_id in image_library for seg_id in active_ids)):
+            logger.info("♻️ Script unchanged for video %s, reusing existing documentation", video_id)
+            return existing_doc
+
+        # Nothing to document: skip the scratch dir, frame capture and the LLM call
+        if not active_ids:
+            logger.info("📄 No active segments for video %s, storing an empty guide", video_id)
+            updated_doc = {
+                "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "steps": [],
+                "markdown": "",
+                "images": image_library,
+                "script_hash": script_hash
+            }
+            self.video_repo.update(video_id, existing_video=video, documentation=updated_doc)
+            return updated_doc
+
+        # Scratch space is only created once there are frames to capture
+        tmp_dir = None
+        video_tmp_dir = None
+        ai_executor = None
         local_video_path = None
+        signed_source = None
         
         def ensure_video_downloaded():
-            nonlocal local_video_path
+            nonlocal local_video_path, video_tmp_dir
             if local_video_path:
                 return local_video_path
             
@@ -114,25 +227,73 @@ class DocumentGenerationService:
                 local_video_path = video_url
                 return local_video_path
 
-            print(f"📥 Downloading video for frame extraction: {video_url}")
-            local_video_path = str(tmp_dir / "temp_video.mp4")
+            logger.info("📥 Downloading video for frame extraction: %s", video_url)
+            # Full videos stay on disk; only the small screenshots go to tmpfs
+            video_tmp_dir = Path(tempfile.mkdtemp(prefix="doc_video_"))
+            local_video_path = str(video_tmp_dir / "temp_video.mp4")
             
             if video_url.startswith("gs://"):
-                from src.infrastructure.storage_service import download_file
-                parts = video_url[5:].split("/", 1)
-                download_file(parts[0], parts[1], local_video_path)
+                bucket, blob_name = parse_gcs_uri(video_url)
+                download_file(bucket, blob_name, local_video_path)
             else:
-                import requests
-                with requests.get(video_url, stream=True) as r:
+                with _http.get(video_url, stream=True) as r:
                     r.raise_for_status()
+                    # Copy straight from the socket in large blocks instead of a Python loop over 8 KiB chunks
+                    r.raw.decode_content = True
+                    size = int(r.headers.get("Content-Length") or 0)
                     with open(local_video_path, 'wb') as f:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            f.write(chunk)
+                        # Reserve the full extent up front, as download_file does for GCS
+                        if size and "Content-Encoding" not in r.headers and hasattr(os, "posix_fallocate"):
+                            os.posix_fallocate(f.fileno(), 0, size)
+                        shutil.copyfileobj(r.raw, f, length=GCS_WRITE_BUFFER_SIZE)
             return local_video_path
 
+        def remote_video_source():
+            """
+            URL ffmpeg can read directly, seeking via HTTP range requests so only
+            the bytes around each capture time are fetched. None for local videos.
+            """
+            nonlocal signed_source
+            if not (video_url.startswith("gs://") or video_url.startswith("http")):
+                return None
+            if signed_source:
+                return signed_source
+            bucket, blob_name = parse_gcs_uri(video_url)
+            if bucket:
+                signed_source = generate_signed_url(bucket, blob_name)
+                if signed_source:
+                    return signed_source
+            return video_url if video_url.startswith("http") else None
+
+        scenes = None
+
+        def snap_to_scene(start_time, duration, capture_time):
+            """
+            Moves a capture onto the nearest scene change inside the segment, where
+            the new screen has just appeared, instead of a fixed offset that may land
+            mid-transition. Scenes are detected once, on first use.
+            """
+            nonlocal scenes
+            if scenes is None:
+                try:
+                    scenes = self.video_service.scene_timestamps(
+                        remote_video_source() or video_url, GUIDE_SCENE_THRESHOLD
+                    )
+                except Exception as e:
+                    logger.warning("⚠️ Scene detection failed (%s), using fixed capture offsets", e)
+                    scenes = []
+            lo = bisect.bisect_left(scenes, start_time)
+            hi = bisect.bisect_right(scenes, start_time + duration)
+            if lo >= hi:
+                return capture_time
+            return min(scenes[lo:hi], key=lambda t: abs(t - capture_time))
+
         try:
-            print(f"📄 Generating documentation for video {video_id}...")
+            logger.info("📄 Generating documentation for video %s...", video_id)
             
+            # 1. Plan steps and collect the screenshots we don't have yet
+            planned_steps = []
+            pending_captures = []
             for i, seg in enumerate(script):
                 if seg.get("is_deleted") or seg.get("isDeleted"):
                     continue
@@ -145,64 +306,142 @@ class DocumentGenerationService:
 
                 # Reuse logic
                 if seg_id in image_library:
-                    print(f"♻️ Reusing existing screenshot for segment {seg_id}")
-                    public_url = image_library[seg_id]
+                    logger.info("♻️ Reusing existing screenshot for segment %s", seg_id)
+                    planned_steps.append((i, seg, capture_time))
                 else:
-                    # Actually capture it
+                    if GUIDE_SCENE_SNAP:
+                        capture_time = snap_to_scene(start_time, duration, capture_time)
+                    planned_steps.append((i, seg, capture_time))
                     screenshot_filename = f"step_{i:03d}_{seg_id}.jpg"
-                    local_path = tmp_dir / screenshot_filename
-                    
-                    try:
-                        v_path = ensure_video_downloaded()
-                        print(f"📸 Capturing frame at {capture_time:.2f}s for segment {seg_id}")
-                        self.video_service.extract_frame(v_path, capture_time, local_path)
-                        
+                    pending_captures.append((seg_id, capture_time, screenshot_filename))
+
+            guide_title = video.title or "Tutorial Guide"
+
+            def build_steps(library):
+                steps = []
+                for i, seg, capture_time in planned_steps:
+                    seg_id = seg['id']
+                    public_url = library.get(seg_id)
+                    if not public_url:
+                        continue
+
+                    step_data = {
+                        "segment_id": seg_id,
+                        "order": i + 1,
+                        "timestamp": capture_time,
+                        "screenshot_url": public_url,
+                        "title": seg.get("ui_element", f"Step {i+1}"),
+                        "action": seg.get("user_action", ""),
+                        "voiceover_text": seg.get("voiceover_text", "")
+                    }
+                    steps.append(step_data)
+                return steps
+
+            # 2. Capture missing screenshots in batched ffmpeg passes; each frame is
+            # uploaded as soon as it lands, overlapping GCS round-trips with decoding
+            ai_future = None
+            expected_library = None
+            if pending_captures:
+                tmp_dir = Path(tempfile.mkdtemp(prefix="doc_gen_", dir=_frame_scratch_root()))
+                # Time order keeps each batch within a contiguous stretch of the video
+                pending_captures = sorted(
+                    [(seg_id, capture_time, tmp_dir / name) for seg_id, capture_time, name in pending_captures],
+                    key=lambda c: c[1]
+                )
+                seg_by_path = {local_path: seg_id for seg_id, _, local_path in pending_captures}
+                uploads = {}
+                expected_urls = {}
+
+                with ThreadPoolExecutor(max_workers=max(1, min(GCS_UPLOAD_WORKERS, len(pending_captures)))) as executor:
+                    def submit_upload(seg_id, local_path):
+                        if seg_id in uploads:
+                            return
                         if not local_path.exists():
-                            print(f"⚠️ Warning: Frame extraction failed for segment {seg_id}")
-                            continue
+                            logger.warning("⚠️ Warning: Frame extraction failed for segment %s", seg_id)
+                            return
+                        blob_path = f"processed/{video_id}/docs/{local_path.name}"
+                        expected_urls[seg_id] = public_url_for(bucket_name, blob_path)
+                        uploads[seg_id] = executor.submit(upload_file, bucket_name, str(local_path), blob_path)
 
-                        # Upload
-                        blob_path = f"processed/{video_id}/docs/{screenshot_filename}"
-                        print(f"☁️ Uploading screenshot to {blob_path}")
-                        public_url = upload_file(bucket_name, str(local_path), blob_path)
-                        
-                        if not public_url:
-                            continue
+                    def on_batch(outputs):
+                        for local_path in outputs:
+                            submit_upload(seg_by_path[local_path], local_path)
 
-                        # Add to library
-                        image_library[seg_id] = public_url
-                        
+                    try:
+                        v_path = remote_video_source() or ensure_video_downloaded()
+                        logger.info("📸 Capturing %s frames in batched passes", len(pending_captures))
+                        self.video_service.extract_frames_batch(
+                            v_path,
+                            [capture_time for _, capture_time, _ in pending_captures],
+                            [local_path for _, _, local_path in pending_captures],
+                            on_batch=on_batch
+                        )
                     except Exception as e:
-                        print(f"❌ Error capturing segment {seg_id}: {e}")
-                        continue
+                        # Fall back to per-frame capture from a local copy so neither remote
+                        # reads nor one bad timestamp can sink the whole batch
+                        logger.warning("⚠️ Batch frame capture failed (%s), retrying frame by frame", e)
+                        for seg_id, capture_time, local_path in pending_captures:
+                            if seg_id in uploads:
+                                continue
+                            try:
+                                self.video_service.extract_frame(ensure_video_downloaded(), capture_time, local_path)
+                            except Exception as e:
+                                logger.error("❌ Error capturing segment %s: %s", seg_id, e)
+                            submit_upload(seg_id, local_path)
+
+                    # Blob paths are deterministic, so the public URLs are known before the
+                    # uploads finish: start the Gemini call now and let it run alongside them
+                    expected_library = {**image_library, **expected_urls}
+                    ai_executor = ThreadPoolExecutor(max_workers=1)
+                    ai_future = ai_executor.submit(
+                        self.generate_ai_markdown_guide, video_id, build_steps(expected_library), guide_title
+                    )
+
+                    futures = {future: seg_id for seg_id, future in uploads.items()}
+                    for future in as_completed(futures):
+                        seg_id = futures[future]
+                        try:
+                            public_url = future.result()
+                        except Exception as e:
+                            logger.error("❌ Error uploading segment %s: %s", seg_id, e)
+                            continue
+
+                        if public_url:
+                            # Add to library
+                            image_library[seg_id] = public_url
+
+            documentation_steps = build_steps(image_library)
 
-                step_data = {
-                    "segment_id": seg_id,
-                    "order": i + 1,
-                    "timestamp": capture_time,
-                    "screenshot_url": public_url,
-                    "title": seg.get("ui_element", f"Step {i+1}"),
-                    "action": seg.get("user_action", ""),
-                    "voiceover_text": seg.get("voiceover_text", "")
-                }
-                documentation_steps.append(step_data)
-                
             # 3. Generate AI-powered Markdown
-            ai_markdown = self.generate_ai_markdown_guide(video_id, documentation_steps)
+            if ai_future:
+                ai_markdown = ai_future.result()
+                if image_library != expected_library:
+                    # An upload failed or returned a different URL; the guide must only
+                    # reference screenshots that actually exist
+                    ai_markdown = self.generate_ai_markdown_guide(video_id, documentation_steps, title=guide_title)
+            else:
+                ai_markdown = self.generate_ai_markdown_guide(video_id, documentation_steps, title=guide_title)
             
-            # 4. Save to Video Data
+            # 4. Save to Video Data. The hash is only recorded for a complete guide, so
+            # steps whose screenshot failed are retried on the next call
+            complete = all(seg_id in image_library for seg_id in active_ids)
             updated_doc = {
                 "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
                 "steps": documentation_steps,
                 "markdown": ai_markdown,
-                "images": image_library # Preserve the library
+                "images": image_library, # Preserve the library
+                "script_hash": script_hash if complete else None
             }
             
             # Update DB
             self.video_repo.update(video_id, existing_video=video, documentation=updated_doc)
             
-            print(f"✅ Documentation generated with {len(documentation_steps)} steps. {len(image_library)} images in library.")
+            logger.info("✅ Documentation generated with %s steps. %s images in library.", len(documentation_steps), len(image_library))
             return updated_doc
 
         finally:
-            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if ai_executor:
+                ai_executor.shutdown(wait=False)
+            for d in (tmp_dir, video_tmp_dir):
+                if d:
+                    shutil.rmtree(d, ignore_errors=True)
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from src.domain.repositories.video_export_repository import VideoExportRepository
+
+class ExportJobTracker:
+    """
+    Holds an export job's latest state in memory and pushes changes to the
+    repository from a single flusher task. Progress updates within one stage
+    are coalesced, but every status change gets its own write so no stage is
+    skipped. Writes are throttled to one per 'min_interval' seconds (closing
+    flushes immediately), and the synchronous repository call runs off the
+    event loop.
+    """
+    def __init__(self, job_id: str, repo: VideoExportRepository, min_interval: float = 0.5):
+        self.job_id = job_id
+        self.repo = repo
+        self.min_interval = min_interval
+        # Unwritten changes, one dict per stage; only the last one is still open
+        self.pending = []
+        self.event = asyncio.Event()
+        self.closed = False
+        self._closing = asyncio.Event()
+        self._flusher_task = asyncio.create_task(self._flusher())
+
+    def update(self, **changes):
+        """Records new job state and wakes the flusher."""
+        status = changes.get("status")
+        if not self.pending or (status is not None and self.pending[-1].get("status", status) != status):
+            self.pending.append({})
+        self.pending[-1].update(changes)
+        self.event.set()
+
+    async def _flusher(self):
+        while True:
+            await self.event.wait()
+            self.event.clear()
+            while self.pending:
+                snapshot = self.pending.pop(0)
+                last_flush = time.monotonic()
+                await asyncio.to_thread(self.repo.update, self.job_id, **snapshot)
+
+                # Let further updates pile up until the interval passes or we're closed
+                remaining = self.min_interval - (time.monotonic() - last_flush)
+                if remaining > 0 and not self.closed:
+                    try:
+                        await asyncio.wait_for(self._closing.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            if self.closed and not self.pending:
+                return
+
+    async def close(self):
+        """Flushes any remaining state and waits for the flusher to finish."""
+        self.closed = True
+        self._closing.set()
+        self.event.set()
+        await self._flusher_task
+
+    def cancel(self):
+        """Stops the flusher without writing pending state (e.g. on failure)."""
+        self._flusher_task.cancel()
@@ -1,123 +1,231 @@
 import os
-import uuid
+import logging
 import time
-from datetime import datetime
+import queue
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from src.application.script_service import (
-    analyze_video_full_pipeline,
-    load_script,
+    analyze_video_cached,
     save_script,
     get_default_project_template
 )
-from src.infrastructure.voice_service import generate_voiceover
-from src.infrastructure.storage_service import download_file, upload_file
+from src.infrastructure.voice_service import generate_voiceover, estimate_word_timestamps
+from src.infrastructure.storage_service import download_file, upload_file, parse_gcs_uri, get_blob_size, get_blob_md5
 from src.application.video_service import VideoService
 from src.application.audio_service import AudioService
 from src.application.use_cases.create_video import CreateVideoUseCase
+from src.config import GCS_UPLOAD_WORKERS, TTS_MAX_WORKERS, PROBE_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Scripts longer than this build the narration timeline with a NumPy cumsum
+NUMPY_TIMELINE_MIN_SEGMENTS = 50
+
+# Storage calls retried with 1s, 2s, ... backoff before the pipeline gives up
+STORAGE_RETRY_ATTEMPTS = 3
+
+def _with_retry(fn, *args, attempts=STORAGE_RETRY_ATTEMPTS):
+    """
+    Calls a storage helper until it returns a result. The helpers report
+    failures by returning None, so both that and exceptions are retried.
+    """
+    for attempt in range(attempts):
+        try:
+            result = fn(*args)
+            if result is not None:
+                return result
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            logger.warning("  ⚠️ %s failed (%s), retrying...", fn.__name__, e)
+        if attempt < attempts - 1:
+            time.sleep(2 ** attempt)
+    return None
 
 
 class NarrationPipeline:
-    def __init__(self, gemini_client, tts_creds, base_dir):
+    def __init__(self, gemini_client, tts_creds, base_dir, tts_concurrency=TTS_MAX_WORKERS):
         self.client = gemini_client
         self.creds = tts_creds
         self.base_dir = base_dir
+        self.tts_concurrency = tts_concurrency
+        # Destination bucket for processed assets, read once instead of per upload
+        self._bucket_name = os.getenv("GCS_BUCKET_NAME", "evalsy-storage")
 
         # Centralized output directory
         self.output_dir = os.path.join(base_dir, "output")
         os.makedirs(self.output_dir, exist_ok=True)
+        self.analysis_cache_dir = os.path.join(self.output_dir, ".gemini_cache")
 
         self.video_service = VideoService()
         self.audio_service = AudioService()
 
     def _timestamp_to_seconds(self, ts):
-        parts = ts.split(':')
-        if len(parts) == 1:
-            return float(parts[0])
-        return int(parts[0]) * 60 + float(parts[1])
+        # rpartition avoids building a list for the usual MM:SS(.ss) form
+        head, sep, tail = ts.rpartition(':')
+        if not sep:
+            return float(tail)
+        hours, sep, minutes = head.rpartition(':')
+        seconds = int(minutes) * 60 + float(tail)
+        return int(hours) * 3600 + seconds if sep else seconds
 
     def _seconds_to_timestamp(self, seconds):
         m = int(seconds // 60)
         s = seconds % 60
-        return f"{m:02d}:{s:05.2f}"
+        return "%02d:%05.2f" % (m, s)
 
-    # ✅ NEW: explicit narration timeline builder
-    def compute_narration_timeline(self, script):
+    def _narration_bounds(self, script):
         """
-        Adds narration_start and narration_end to each script segment.
-        Does NOT remove or redefine existing start_time/end_time.
-        This produces an unambiguous narration (audio) timeline for the frontend.
+        Returns (durations, starts, ends) for the contiguous narration timeline,
+        where each segment occupies audio_duration + pause_duration. Long scripts
+        take the running sum in NumPy instead of a Python loop.
         """
-        narration_cursor = 0.0
-
-        for seg in script:
-            audio_dur = float(seg.get("audio_duration", 0) or 0)
-            pause_dur = float(seg.get("pause_duration", 0) or 0)
+        durations = [
+            float(seg.get("audio_duration", 0) or 0) + float(seg.get("pause_duration", 0) or 0)
+            for seg in script
+        ]
 
-            seg["narration_start"] = round(narration_cursor, 3)
-            seg["narration_end"] = round(narration_cursor + audio_dur + pause_dur, 3)
+        if len(durations) > NUMPY_TIMELINE_MIN_SEGMENTS:
+            ends = np.cumsum(durations).round(3)
+            starts = np.concatenate(([0.0], ends[:-1]))
+            return durations, starts.tolist(), ends.tolist()
 
-            narration_cursor = seg["narration_end"]
+        starts, ends = [], []
+        narration_cursor = 0.0
+        for seg_dur in durations:
+            starts.append(round(narration_cursor, 3))
+            narration_cursor = round(narration_cursor + seg_dur, 3)
+            ends.append(narration_cursor)
+        return durations, starts, ends
 
-        return script
+    def _report_narration_check(self, expected, computed):
+        if abs(expected - computed) > 0.05:
+            logger.warning(
+                "⚠️ [Timeline] Narration duration mismatch detected\n"
+                "   Expected(sum audio+pause): %.3fs\n"
+                "   Computed(narration_end):  %.3fs",
+                expected, computed
+            )
+        else:
+            logger.info("✅ [Timeline] Narration duration validated: %.3fs", computed)
 
-    # ✅ NEW: compute narration duration safely from narration timeline
-    def get_narration_duration(self, script):
+    # ✅ NEW: explicit narration timeline, with a soft validation that never breaks the pipeline
+    def finalize_narration_timeline(self, script):
         """
-        Returns total narration duration based on narration_end if present,
-        otherwise falls back to sum(audio_duration + pause_duration).
+        Adds narration_start and narration_end to each script segment, without
+        removing or redefining start_time/end_time, and logs if the narration
+        duration mismatches the sum of audio+pause. Returns the narration
+        duration (latest narration_end among active segments).
         """
-        active = [s for s in script if not s.get("isDeleted", False)]
-        if not active:
+        durations, starts, ends = self._narration_bounds(script)
+        expected = 0.0
+        computed = None
+
+        for seg, seg_dur, start, end in zip(script, durations, starts, ends):
+            seg["narration_start"] = start
+            seg["narration_end"] = end
+
+            if not seg.get("isDeleted", False):
+                expected += seg_dur
+                computed = end if computed is None else max(computed, end)
+
+        if computed is None:
             return 0.0
 
-        # If narration_end exists, use it
-        if all("narration_end" in s for s in active):
-            return float(max(s.get("narration_end", 0) for s in active))
+        computed = float(computed)
+        self._report_narration_check(expected, computed)
+        return computed
 
-        # Fallback: sum durations
-        return float(
-            sum(
-                float(s.get("audio_duration", 0) or 0) + float(s.get("pause_duration", 0) or 0)
-                for s in active
+    def synthesize_narrations(self, script, voiceovers_dir):
+        """
+        Producer/consumer stage: TTS synthesis feeds a bounded queue while a
+        worker thread measures each finished clip with ffprobe, so probing
+        overlaps with synthesis of the next line.
+        """
+        segments = queue.Queue(maxsize=2)
+        durations = {}
+
+        def probe_worker():
+            while True:
+                audio = segments.get()
+                if audio is None:
+                    return
+                try:
+                    durations[audio["filename"]] = self.video_service.get_audio_duration(audio["filename"])
+                except Exception as e:
+                    # resolve_timeline probes again for anything missing here
+                    logger.warning("  ⚠️ Could not probe %s: %s", audio['filename'], e)
+
+        consumer = threading.Thread(target=probe_worker, daemon=True)
+        consumer.start()
+        try:
+            audio_files = generate_voiceover(
+                script, self.creds, output_dir=voiceovers_dir,
+                on_segment=segments.put, max_workers=self.tts_concurrency
             )
-        )
+        finally:
+            segments.put(None)
+            consumer.join()
+
+        for audio in audio_files:
+            if audio["filename"] in durations:
+                audio["audio_duration"] = durations[audio["filename"]]
+
+        return audio_files
 
-    # ✅ NEW: soft validation, never breaks working pipeline
-    def validate_narration_timeline(self, script):
+    def _probe_durations(self, audio_files):
         """
-        Logs if narration duration mismatches the sum of audio+pause.
-        Does not raise, does not break production.
+        Fills in audio_duration for any clip that doesn't have one yet. The probes
+        are subprocess-bound, so they run side by side rather than one at a time.
         """
-        active = [s for s in script if not s.get("isDeleted", False)]
-        if not active:
+        missing = [a for a in audio_files if a.get("audio_duration") is None]
+        if not missing:
             return
 
-        expected = sum(
-            float(s.get("audio_duration", 0) or 0) + float(s.get("pause_duration", 0) or 0)
-            for s in active
-        )
-        computed = self.get_narration_duration(script)
+        with ThreadPoolExecutor(max_workers=min(PROBE_MAX_WORKERS, len(missing))) as executor:
+            durations = executor.map(lambda a: self.video_service.get_audio_duration(a["filename"]), missing)
+            for audio, duration in zip(missing, durations):
+                audio["audio_duration"] = duration
 
-        if abs(expected - computed) > 0.05:
-            print("⚠️ [Timeline] Narration duration mismatch detected")
-            print(f"   Expected(sum audio+pause): {expected:.3f}s")
-            print(f"   Computed(narration_end):  {computed:.3f}s")
-        else:
-            print(f"✅ [Timeline] Narration duration validated: {computed:.3f}s")
+    def _collision_free_starts(self, original_starts, durations, gap):
+        """
+        start[i] = max(original[i], start[i-1] + duration[i-1] + gap), i.e. prevent
+        overlap but DO NOT collapse gaps. Subtracting the running sum of
+        duration + gap turns the recurrence into a running max, which long
+        scripts evaluate with np.maximum.accumulate.
+        """
+        if len(original_starts) > NUMPY_TIMELINE_MIN_SEGMENTS:
+            original = np.asarray(original_starts, dtype=np.float64)
+            offsets = np.concatenate(([0.0], np.cumsum(np.asarray(durations[:-1], dtype=np.float64) + gap)))
+            shifted = np.maximum.accumulate(np.maximum(original - offsets, 0.0)) + offsets
+            # Float noise from the running sum must not register as a collision
+            return np.where(shifted - original > 1e-9, shifted, original).tolist()
+
+        starts = []
+        next_available = 0.0
+        for original_start, audio_duration in zip(original_starts, durations):
+            start_time = max(original_start, next_available)
+            starts.append(start_time)
+            next_available = start_time + audio_duration + gap
+        return starts
 
     def resolve_timeline(self, audio_files, script):
-        print(f"⌛ [Timeline] Resolving collisions...")
-        next_available = 0.0
+        logger.info("⌛ [Timeline] Resolving collisions...")
         gap = 0.3
         collisions = 0
 
-        for i, seg in enumerate(audio_files):
-            audio_duration = self.video_service.get_audio_duration(seg['filename'])
+        self._probe_durations(audio_files)
 
-            # Original intended start
-            original_start = self._timestamp_to_seconds(seg['timestamp'])
+        # Original intended starts; collisions push a clip to just after the previous one
+        original_starts = [self._timestamp_to_seconds(seg['timestamp']) for seg in audio_files]
+        durations = [seg['audio_duration'] for seg in audio_files]
+        start_times = self._collision_free_starts(original_starts, durations, gap)
 
-            # Prevent overlap, but DO NOT collapse gaps
-            start_time = max(original_start, next_available)
+        for i, seg in enumerate(audio_files):
+            audio_duration = durations[i]
+            original_start = original_starts[i]
+            start_time = start_times[i]
 
             if start_time > original_start:
                 collisions += 1
@@ -128,50 +236,38 @@ class NarrationPipeline:
 
             end_time = start_time + audio_duration
 
-            # Write narration timeline explicitly
-            # NOTE: This preserves existing behavior that uses start_time/end_time.
-            # The new narration_start/narration_end will be added later without removing anything.
             # Write narration timeline explicitly
             # NOTE: This preserves existing behavior that uses start_time/end_time.
             # The new narration_start/narration_end will be added later without removing anything.
             if i < len(script):
-                script[i]["start_time"] = round(start_time, 3)
-                script[i]["duration"] = round(audio_duration, 3)
-                script[i]["end_time"] = round(end_time, 3)
-                script[i]["audio_duration"] = round(audio_duration, 3)
-                
-                # ✅ NEW: Calculate Word Spans for Karaoke Captions
-                # We do this here because we have the EXACT audio_duration from ffprobe
-                from src.infrastructure.voice_service import estimate_word_timestamps
-                word_spans = estimate_word_timestamps(script[i]["voiceover_text"], audio_duration)
-                script[i]["wordSpans"] = word_spans
-
-            next_available = end_time + gap
+                rounded_duration = round(audio_duration, 3)
+                script[i].update({
+                    "start_time": round(start_time, 3),
+                    "duration": rounded_duration,
+                    "end_time": round(end_time, 3),
+                    "audio_duration": rounded_duration
+                })
 
         if collisions > 0:
-            print(f"  ⚠️ Fixed {collisions} overlapping segments.")
+            logger.warning("  ⚠️ Fixed %d overlapping segments.", collisions)
         else:
-            print(f"  ✅ No audio collisions detected.")
+            logger.info("  ✅ No audio collisions detected.")
 
         return audio_files, script
 
+    def attach_word_spans(self, audio_files, script):
+        """
+        ✅ NEW: Calculate Word Spans for Karaoke Captions, from the EXACT ffprobe
+        audio_duration of each clip. Only the frontend reads wordSpans, so this
+        can run off the critical path while the video is assembled.
+        """
+        for seg, audio in zip(script, audio_files):
+            seg["wordSpans"] = estimate_word_timestamps(seg["voiceover_text"], audio["audio_duration"])
+        return script
+
     def download_video(self, gcs_uri):
         """Helper to download a video from GCS"""
-        from urllib.parse import urlparse
-
-        bucket_name, blob_name = None, None
-
-        if gcs_uri.startswith("gs://"):
-            # gs://bucket/blob
-            if "/" in gcs_uri[5:]:
-                bucket_name, blob_name = gcs_uri[5:].split("/", 1)
-        elif gcs_uri.startswith("http"):
-            # https://storage.googleapis.com/bucket/blob
-            parsed = urlparse(gcs_uri)
-            if "storage.googleapis.com" in parsed.netloc:
-                path = parsed.path.lstrip("/")
-                if "/" in path:
-                    bucket_name, blob_name = path.split("/", 1)
+        bucket_name, blob_name = parse_gcs_uri(gcs_uri)
 
         if not bucket_name or not blob_name:
             raise ValueError(f"Invalid GCS URI: {gcs_uri}")
@@ -179,35 +275,79 @@ class NarrationPipeline:
         base_name = os.path.splitext(blob_name)[0]
         local_path = os.path.join(self.output_dir, f"raw_{base_name}.mp4")
 
-        if os.path.exists(local_path):
-            print(f"  📂 Using existing local raw video: {local_path}")
-            return local_path
-
-        local_raw = download_file(bucket_name, blob_name, local_path)
+        try:
+            local_size = os.stat(local_path).st_size
+        except FileNotFoundError:
+            local_size = 0
+
+        if local_size > 0:
+            # A crashed earlier run can leave a truncated file behind; only reuse
+            # the local copy when it matches the blob's size
+            remote_size = get_blob_size(bucket_name, blob_name)
+            if remote_size is None or local_size == remote_size:
+                logger.info("  📂 Using existing local raw video: %s", local_path)
+                return local_path
+            logger.warning("  ⚠️ Local raw video is %d bytes, expected %d; downloading again", local_size, remote_size)
+
+        local_raw = _with_retry(download_file, bucket_name, blob_name, local_path)
         if not local_raw:
             raise RuntimeError(f"Failed to download video from {gcs_uri}")
         return local_raw
 
-    def upload_asset(self, local_path, destination_blob):
+    def analyze(self, gcs_video_uri):
+        """
+        Gemini analysis of the source video, reused from disk when the same object
+        (same URI and MD5) was analyzed before with the current prompt.
+        """
+        bucket_name, blob_name = parse_gcs_uri(gcs_video_uri)
+        content_hash = get_blob_md5(bucket_name, blob_name) if bucket_name else None
+        return analyze_video_cached(self.client, gcs_video_uri, self.analysis_cache_dir, content_hash=content_hash)
+
+    def start_analysis(self, gcs_video_uri):
+        """
+        Starts the Gemini analysis of the source video in the background. It only
+        needs the GCS URI, so it can overlap with download_video; pass the returned
+        future to run(analysis=...).
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(self.analyze, gcs_video_uri)
+        executor.shutdown(wait=False)
+        return future
+
+    def upload_asset(self, local_path, destination_blob, bucket_name=None):
         """Helper to upload a local file to GCS"""
-        bucket_name = os.getenv("GCS_BUCKET_NAME", "evalsy-storage")
-        return upload_file(bucket_name, local_path, destination_blob)
+        bucket_name = bucket_name or self._bucket_name
+        return _with_retry(upload_file, bucket_name, local_path, destination_blob)
+
+    def upload_voiceovers(self, audio_files, project_id, bucket_name=None):
+        """
+        Uploads all voiceover clips concurrently; each is a small independent
+        request, so latency rather than bandwidth dominates. URLs keep input order.
+        """
+        if not audio_files:
+            return []
+
+        local_paths = [audio['filename'] for audio in audio_files]
+        blob_names = [f"processed/{project_id}/voiceovers/{os.path.basename(path)}" for path in local_paths]
 
-    def run(self, local_raw_path, gcs_video_uri, video_id=None, user_id=None, title=None, video_uri=None, use_case: CreateVideoUseCase = None):
-        pipeline_start = time.time()
+        with ThreadPoolExecutor(max_workers=min(GCS_UPLOAD_WORKERS, len(audio_files))) as executor:
+            return list(executor.map(self.upload_asset, local_paths, blob_names, [bucket_name] * len(local_paths)))
+
+    def run(self, local_raw_path, gcs_video_uri, video_id=None, user_id=None, title=None, video_uri=None, use_case: CreateVideoUseCase = None, user_ip="0.0.0.0", user_country="unknown", analysis=None):
+        pipeline_start = time.perf_counter()
         timings = {}
 
-        print(f"\n🚀 CORE NARRATION PIPELINE")
-        print(f"-" * 40)
+        logger.info("\n🚀 CORE NARRATION PIPELINE\n%s", "-" * 40)
 
         # Setup unique project identity
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = uuid.uuid4().hex[:4]
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        unique_id = os.urandom(2).hex()
         base_name = os.path.splitext(os.path.basename(local_raw_path))[0].replace("raw_", "")
         project_id = f"{base_name}_{timestamp}_{unique_id}"
 
-        # Determine GCS bucket
-        bucket_name = os.getenv("GCS_BUCKET_NAME", "evalsy-storage")
+        # Determine GCS bucket and mode once for the whole run
+        bucket_name = self._bucket_name
+        use_local = os.getenv("ENV", "local").lower() == "local"
 
         # Create project-specific local directory
         project_dir = os.path.join(self.output_dir, project_id)
@@ -221,19 +361,20 @@ class NarrationPipeline:
         project_config["metadata"]["generated_at"] = timestamp
         project_config["metadata"]["project_id"] = project_id
 
-        # Determine if we are in local mode
-        use_local = os.getenv("ENV", "local").lower() == "local"
-
         # 2. Scripting
-        step_start = time.time()
+        step_start = time.perf_counter()
         cleanup_segments = []
 
-        print(f"📝 [2/5] Generating AI Script...")
+        logger.info("📝 [2/5] Generating AI Script...")
 
-        analysis_result = analyze_video_full_pipeline(self.client, gcs_video_uri)
+        # Use the analysis started by start_analysis() when the caller kicked one off
+        if analysis is not None:
+            analysis_result = analysis.result()
+        else:
+            analysis_result = self.analyze(gcs_video_uri)
 
         if not analysis_result or "script_timeline" not in analysis_result:
-            print("❌ Error: Could not generate script.")
+            logger.error("❌ Error: Could not generate script.")
             return None
 
         script = analysis_result.get("script_timeline", [])
@@ -243,59 +384,70 @@ class NarrationPipeline:
         project_config["script"] = script
         project_config["cleanup_segments"] = cleanup_segments
 
-        timings["AI Scripting"] = time.time() - step_start
+        timings["AI Scripting"] = time.perf_counter() - step_start
 
         # 3. Voice Generation
-        step_start = time.time()
-        print(f"🎤 [3/5] Synthesizing Narrations ({len(script)} lines)...")
+        step_start = time.perf_counter()
+        logger.info("🎤 [3/5] Synthesizing Narrations (%d lines)...", len(script))
         # Ensure we pass the project-specific voiceovers directory
-        audio_files = generate_voiceover(script, self.creds, output_dir=voiceovers_dir)
-        timings["Voice synthesis"] = time.time() - step_start
+        audio_files = self.synthesize_narrations(script, voiceovers_dir)
+        timings["Voice synthesis"] = time.perf_counter() - step_start
 
         # 4. Final Assembler
-        print(f"🎬 [4/5] Assembling Final Video...")
+        logger.info("🎬 [4/5] Assembling Final Video...")
 
         # Resolve timeline overlaps before assembly
-        resolve_start = time.time()
+        resolve_start = time.perf_counter()
         audio_files, script = self.resolve_timeline(audio_files, script)
-        timings["Collision Fix"] = time.time() - resolve_start
+        timings["Collision Fix"] = time.perf_counter() - resolve_start
 
-        # ✅ FIX: Add explicit narration timeline (contiguous) without removing start_time/end_time
-        script = self.compute_narration_timeline(script)
+        # ✅ FIX: Add explicit narration timeline (contiguous) without removing start_time/end_time,
+        # validating it (non-breaking) in the same pass
+        narration_duration = self.finalize_narration_timeline(script)
 
-        # ✅ FIX: Validate narration timeline (non-breaking)
-        self.validate_narration_timeline(script)
-
-        assemble_start = time.time()
         final_video_name = f"final_{base_name}.mp4"
         final_video_path = os.path.join(project_dir, final_video_name)
-        self.video_service.assemble_steps(
-            raw_video=local_raw_path,
-            script=script,
-            audio_files=audio_files,
-            output_path=final_video_path,
-            cleanup_segments=cleanup_segments
-        )
-        timings["Video Assembly"] = time.time() - assemble_start
-
-        # Create MP3
-        audio_concat_start = time.time()
         final_audio_name = f"narration_{base_name}.mp3"
         final_audio_path = os.path.join(project_dir, final_audio_name)
-        self.audio_service.concat_audio_files(audio_files, final_audio_path, project_dir)
-        timings["Audio Concat"] = time.time() - audio_concat_start
+
+        def concat_narration():
+            # Create MP3
+            audio_concat_start = time.perf_counter()
+            self.audio_service.concat_audio_files(audio_files, final_audio_path, project_dir)
+            timings["Audio Concat"] = time.perf_counter() - audio_concat_start
+
+        # The MP3 concat only reads the voiceovers and word spans are frontend-only
+        # metadata, so both run alongside video assembly. The voiceover clips are
+        # final once synthesized, so in cloud mode their uploads overlap it too.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            audio_future = executor.submit(concat_narration)
+            spans_future = executor.submit(self.attach_word_spans, audio_files, script)
+            upload_future = None
+            if not use_local:
+                upload_future = executor.submit(self.upload_voiceovers, audio_files, project_id, bucket_name)
+
+            assemble_start = time.perf_counter()
+            self.video_service.assemble_steps(
+                raw_video=local_raw_path,
+                script=script,
+                audio_files=audio_files,
+                output_path=final_video_path,
+                cleanup_segments=cleanup_segments
+            )
+            timings["Video Assembly"] = time.perf_counter() - assemble_start
+
+            audio_future.result()
+            spans_future.result()
+            voiceover_urls = upload_future.result() if upload_future else []
 
         # 5. Cloud Upload (All assets in project folder)
         gcs_video_url = None
         gcs_audio_url = None
 
         if not use_local:
-            print(f"☁️  [5/5] Syncing all assets to Cloud Storage...")
-            # Upload individual voiceovers
-            for i, audio in enumerate(audio_files):
-                audio_blob = f"processed/{project_id}/voiceovers/{os.path.basename(audio['filename'])}"
-                gcs_url = self.upload_asset(audio['filename'], audio_blob)
-
+            logger.info("☁️  [5/5] Syncing all assets to Cloud Storage...")
+            # Individual voiceovers were uploaded during assembly
+            for i, gcs_url in enumerate(voiceover_urls):
                 # Update script segment with GCS URL
                 if i < len(script):
                     script[i]["audio_url"] = gcs_url
@@ -313,29 +465,32 @@ class NarrationPipeline:
 
         # Upload final products
         if not use_local:
-            # Capture the public URL returned by upload()
-            gcs_video_url = self.upload_asset(final_video_path, f"processed/{project_id}/{final_video_name}")
-            gcs_audio_url = self.upload_asset(final_audio_path, f"processed/{project_id}/{final_audio_name}")
-            print(f"  ✅ All assets uploaded to GCS folder: processed/{project_id}/")
+            # Capture the public URL returned by upload(); the two products upload side by side
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                video_future = executor.submit(self.upload_asset, final_video_path, f"processed/{project_id}/{final_video_name}", bucket_name)
+                audio_future = executor.submit(self.upload_asset, final_audio_path, f"processed/{project_id}/{final_audio_name}", bucket_name)
+                gcs_video_url = video_future.result()
+                gcs_audio_url = audio_future.result()
+            logger.info("  ✅ All assets uploaded to GCS folder: processed/%s/", project_id)
 
         # 6. Metadata and Database Update
         if use_case and video_id:
-            print(f"💾 Updating database record for video {video_id}...")
+            logger.info("💾 Updating database record for video %s...", video_id)
 
             # Fetch final properties
-            processed_file_type = os.path.splitext(final_video_path)[1].replace('.', '')
+            processed_file_type = "mp4"  # final_video_name is always final_<base>.mp4
             processed_duration = self.video_service.get_duration(final_video_path)
 
             # ✅ FIX: narration duration must come from narration timeline, not video timestamps
-            narration_end_time = self.get_narration_duration(script)
+            narration_end_time = narration_duration
 
             metadata = {
                 "file_type": processed_file_type,
                 "duration": processed_duration,
                 "narration_duration": narration_end_time,  # audio/script duration (narration timeline)
                 "has_silent_tail": processed_duration > narration_end_time,
-                "user_ip": os.getenv("USER_IP", "0.0.0.0"),
-                "user_country": os.getenv("USER_COUNTRY", "unknown"),
+                "user_ip": user_ip,
+                "user_country": user_country,
                 "processed_video_url": gcs_video_url or final_video_path,
                 # "processed_audio_url": gcs_audio_url or final_audio_path,
                 "project_id": project_id,
@@ -357,16 +512,14 @@ class NarrationPipeline:
             )
 
         # Summary
-        total_pipeline_time = time.time() - pipeline_start
-
-        print(f"\n✨ PROCESSING COMPLETE")
-        print(f"-" * 40)
-        print(f"📊 TIMELINE SUMMARY:")
-        for step, duration in timings.items():
-            print(f"  • {step.ljust(18)}: {duration:6.1f}s")
-        print(f"  {'-' * 28}")
-        print(f"  • {'TOTAL'.ljust(18)}: {total_pipeline_time:6.1f}s")
-        print(f"-" * 40)
+        total_pipeline_time = time.perf_counter() - pipeline_start
+
+        # One record for the whole summary, formatted only if INFO is enabled
+        if logger.isEnabledFor(logging.INFO):
+            lines = ["\n✨ PROCESSING COMPLETE", "-" * 40, "📊 TIMELINE SUMMARY:"]
+            lines += [f"  • {step.ljust(18)}: {duration:6.1f}s" for step, duration in timings.items()]
+            lines += [f"  {'-' * 28}", f"  • {'TOTAL'.ljust(18)}: {total_pipeline_time:6.1f}s", "-" * 40]
+            logger.info("\n".join(lines))
 
         return {
             "project_id": project_id,
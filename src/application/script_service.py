@@ -1,5 +1,7 @@
-import json
 import os
+import hashlib
+import orjson
+from functools import lru_cache
 from typing import Dict, Any
 from google.genai import types
 
@@ -40,6 +42,41 @@ def get_default_project_template() -> Dict[str, Any]:
 
  
 
+# Bump whenever the analysis prompt or model changes so cached results are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+def analyze_video_cached(client, video_uri: str, cache_dir: str, content_hash: str = None, mode: str = "MARKETING"):
+    """
+    analyze_video_full_pipeline memoized on disk under cache_dir, keyed by the
+    video URI, its content hash, the mode and ANALYSIS_PROMPT_VERSION.
+    Only successful analyses (non-empty script_timeline) are cached. Without a
+    content hash the URI alone can't tell a re-upload apart, so the cache is skipped.
+    """
+    if not content_hash:
+        return analyze_video_full_pipeline(client, video_uri, mode)
+
+    key = hashlib.sha256(
+        f"{video_uri}|{content_hash}|{mode.upper()}|{ANALYSIS_PROMPT_VERSION}".encode()
+    ).hexdigest()
+    cache_path = os.path.join(cache_dir, f"{key}.json")
+
+    try:
+        # Parsed fresh on every hit: the pipeline mutates the script it gets back
+        with open(cache_path, "rb") as f:
+            cached = orjson.loads(f.read())
+        if cached.get("script_timeline"):
+            print(f"📁 [Gemini] Reusing cached analysis {key[:12]}")
+            return cached
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable analysis cache {cache_path}: {e}")
+
+    result = analyze_video_full_pipeline(client, video_uri, mode)
+    if result and result.get("script_timeline"):
+        save_script(result, cache_path)
+    return result
+
 def analyze_video_full_pipeline(client, video_uri: str, mode: str = "MARKETING"):
     """
     Enhanced analysis that aligns narration with UI labels but groups them into 
@@ -150,23 +187,31 @@ def analyze_video_full_pipeline(client, video_uri: str, mode: str = "MARKETING")
                 temperature=0.3, # Slightly higher for more natural sentence flow
             )
         )
-        return json.loads(response.text)
+        return orjson.loads(response.text)
         
     except Exception as e:
         print(f"❌ Error: {e}")
         return {"script_timeline": [], "cleanup_segments": []}
 
+@lru_cache(maxsize=32)
+def _load_script_cached(file_path: str, mtime_ns: int):
+    # mtime_ns is part of the key so an edited file is parsed again
+    print(f"📁 Loading script from {file_path}...")
+    with open(file_path, "rb") as f:
+        return orjson.loads(f.read())
+
 def load_script(file_path: str):
     """
-    Read script data from a local JSON file
+    Read script data from a local JSON file.
+    Parsed scripts are cached per file version; treat the result as read-only.
     """
-    if not os.path.exists(file_path):
+    try:
+        mtime_ns = os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
         return None
-        
-    print(f"📁 Loading script from {file_path}...")
+
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return _load_script_cached(file_path, mtime_ns)
     except Exception as e:
         print(f"Error loading script file: {e}")
         return None
@@ -179,9 +224,11 @@ def save_script(script_data, file_path: str):
     try:
         # Ensure dir exists
         os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(script_data, f, indent=2)
-            return True
+        with open(file_path, "wb") as f:
+            f.write(orjson.dumps(script_data, option=orjson.OPT_INDENT_2))
+        # Writes within the same mtime tick must not serve the old parse
+        _load_script_cached.cache_clear()
+        return True
     except Exception as e:
         print(f"Error saving script file: {e}")
         return False
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any
 from src.domain.entities.video import Video
 from src.domain.repositories.video_repository import VideoRepository
@@ -27,7 +27,7 @@ class CreateVideoUseCase:
             status=status,
             video_data=video_data,
             documentation=existing_doc,
-            updated_at=datetime.now()
+            updated_at=datetime.now(timezone.utc)
         )
         
         self.video_repo.save(video)
@@ -5,7 +5,7 @@ import time
 from src.config import VIDEO_BUCKET
 from src.domain.repositories.video_repository import VideoRepository
 from src.infrastructure.voice_service import generate_voiceover
-from src.infrastructure.storage_service import download_file, upload_file
+from src.infrastructure.storage_service import download_file, upload_file, file_md5, get_blob_md5, parse_gcs_uri
 from src.infrastructure.workspace_manager import LocalWorkspace
 from src.application.audio_service import AudioService
 from src.application.video_service import VideoService
@@ -39,22 +39,33 @@ class SyncTimelineUseCase:
             voiceovers_dir = ws.create_dir("voiceovers")
             
             # 2. Update segments and regenerate audio where needed
+            changed = []
             for segment in script:
                 seg_id = segment.get("id")
                 if seg_id in update_map:
-                    new_text = update_map[seg_id]
-                    segment["voiceover_text"] = new_text
-                    
-                    print(f"🎤 Regenerating voiceover for segment {seg_id}...")
-                    # Generate new voiceover MP3 using Google TTS
-                    new_meta = generate_voiceover([segment], creds, output_dir=str(voiceovers_dir))[0]
+                    segment["voiceover_text"] = update_map[seg_id]
+                    changed.append(segment)
+
+            if changed:
+                print(f"🎤 Regenerating voiceovers for {len(changed)} segments...")
+                # Generate all new voiceover MP3s in one concurrent TTS batch
+                new_metas = generate_voiceover(changed, creds, output_dir=str(voiceovers_dir))
+
+                for segment, new_meta in zip(changed, new_metas):
                     local_path = new_meta["filename"]
-                    
+
                     # Calculate new audio duration
                     new_dur = self.video_service.get_audio_duration(local_path)
                     segment["audio_duration"] = round(new_dur, 3)
                     segment["duration"] = round(new_dur, 3) 
                     
+                    # Re-saving text that synthesizes identical audio keeps the current
+                    # object; GCS md5Hash uses the same base64 form as file_md5
+                    current_bucket, current_blob = parse_gcs_uri(segment.get("audio_url") or "")
+                    if current_bucket and get_blob_md5(current_bucket, current_blob) == file_md5(local_path):
+                        print(f"♻️ Voiceover unchanged, skipping upload: {current_blob}")
+                        continue
+
                     # Upload newly generated segment to GCS (returns public URL)
                     blob = f"processed/{project_id}/voiceovers/{os.path.basename(local_path)}"
                     seg_url = upload_file(bucket_name, local_path, blob)
@@ -5,6 +5,7 @@ import tempfile
 import subprocess
 import os
 from pathlib import Path
+from src.config import FFMPEG_THREADS
 
 # Config / Constants
 FREEZE_NOISE = 0.001
@@ -16,17 +17,34 @@ PAD_AFTER = 0.35
 MIN_KEEP_SEG = 0.40
 MIN_CUT_SEG = 0.50
 
+# Input options for HTTP(S) sources: treat the resource as seekable so input-side
+# -ss turns into byte-range requests, and keep connections alive between them
+HTTP_INPUT_ARGS = ["-seekable", "1", "-multiple_requests", "1"]
+
+def _input_args(video_path):
+    path = str(video_path)
+    if path.startswith("http://") or path.startswith("https://"):
+        return [*HTTP_INPUT_ARGS, "-i", path]
+    return ["-i", path]
+
 class VideoService:
     def __init__(self):
         if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
             raise RuntimeError("ffmpeg/ffprobe not found. Install FFmpeg and add it to PATH.")
+        # Probed clip durations keyed by (path, mtime_ns, size), so a rewritten file is probed again
+        self._audio_durations = {}
 
     def _timestamp_to_seconds(self, ts):
         if not ts: return 0.0
-        parts = str(ts).split(':')
-        if len(parts) == 1:
-            return float(parts[0])
-        return int(parts[0]) * 60 + float(parts[1])
+        ts = str(ts)
+        # find() instead of split() so the usual MM:SS(.ss) form builds no list
+        i = ts.find(':')
+        if i < 0:
+            return float(ts)
+        j = ts.find(':', i + 1)
+        if j < 0:
+            return int(ts[:i]) * 60 + float(ts[i + 1:])
+        return int(ts[:i]) * 3600 + int(ts[i + 1:j]) * 60 + float(ts[j + 1:])
 
 
     def run_cmd(self, cmd):
@@ -47,18 +65,19 @@ class VideoService:
         return float(duration_str)
 
     def parse_freezedetect(self, stderr_text):
+        # freezedetect logs freeze_start, freeze_duration and freeze_end on separate
+        # lines, so the duration is taken from the start/end pair
         starts = []
         freezes = []
         for line in stderr_text.splitlines():
             m1 = re.search(r"freeze_start:\s*([0-9.]+)", line)
             if m1:
                 starts.append(float(m1.group(1)))
-            m2 = re.search(r"freeze_end:\s*([0-9.]+).*freeze_duration:\s*([0-9.]+)", line)
+            m2 = re.search(r"freeze_end:\s*([0-9.]+)", line)
             if m2 and starts:
                 end = float(m2.group(1))
-                dur = float(m2.group(2))
                 start = starts.pop(0)
-                if dur >= FREEZE_MIN_D:
+                if end - start >= FREEZE_MIN_D:
                     freezes.append((start, end))
         return freezes
 
@@ -78,6 +97,74 @@ class VideoService:
                     silences.append((start, end))
         return silences
 
+    def has_audio(self, path):
+        out, _ = self.run_cmd([
+            "ffprobe", "-v", "error",
+            "-select_streams", "a",
+            "-show_entries", "stream=index",
+            "-of", "csv=p=0", str(path)
+        ])
+        return bool(out.strip())
+
+    def detect_dead_air(self, input_path, with_audio=True):
+        """
+        One decode pass running freezedetect (and silencedetect when there is an
+        audio track). Returns (freezes, silences) as lists of (start, end).
+        """
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostats",
+            *_input_args(input_path),
+            "-vf", f"freezedetect=n={FREEZE_NOISE}:d={FREEZE_MIN_D}"
+        ]
+        if with_audio:
+            cmd += ["-af", f"silencedetect=noise={SILENCE_DB}dB:d={SILENCE_MIN_D}"]
+        else:
+            cmd += ["-an"]
+        cmd += ["-f", "null", "-"]
+        _, stderr = self.run_cmd(cmd)
+        silences = self.parse_silencedetect(stderr) if with_audio else []
+        return self.parse_freezedetect(stderr), silences
+
+    def intersect_intervals(self, a, b):
+        a, b = self.merge_intervals(a), self.merge_intervals(b)
+        out = []
+        i = j = 0
+        while i < len(a) and j < len(b):
+            s = max(a[i][0], b[j][0])
+            e = min(a[i][1], b[j][1])
+            if e > s:
+                out.append((s, e))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return out
+
+    def fast_trim(self, input_path, output_path):
+        """
+        Cuts dead air from a recording: stretches where the screen is frozen and,
+        if there is an audio track, nothing is said. Kept ranges are padded and
+        re-encoded; when nothing needs cutting the input is only remuxed.
+        """
+        duration = self.get_duration(input_path)
+        with_audio = self.has_audio(input_path)
+        freezes, silences = self.detect_dead_air(input_path, with_audio)
+        cuts = self.intersect_intervals(freezes, silences) if with_audio else freezes
+        cuts = [(s, e) for s, e in cuts if e - s >= MIN_CUT_SEG]
+
+        keep = self.apply_padding(self.invert_to_keep(cuts, duration), duration) if cuts else []
+        if not keep or keep == [(0.0, duration)]:
+            self.run_cmd([
+                "ffmpeg", "-y",
+                *_input_args(input_path),
+                "-c", "copy",
+                "-movflags", "+faststart",
+                str(output_path)
+            ])
+        else:
+            self.export_segments(input_path, keep, output_path)
+        return output_path
+
     def merge_intervals(self, intervals, gap=0.05):
         if not intervals:
             return []
@@ -122,8 +209,9 @@ class VideoService:
                 cmd = [
                     "ffmpeg", "-y",
                     "-ss", f"{s:.3f}", "-to", f"{e:.3f}",
-                    "-i", str(input_path),
+                    *_input_args(input_path),
                     "-c:v", "libx264", "-preset", "ultrafast", "-crf", "23",
+                    "-threads", str(FFMPEG_THREADS),
                     "-c:a", "aac", "-b:a", "128k",
                     "-movflags", "+faststart",
                     str(seg)
@@ -142,6 +230,7 @@ class VideoService:
                 "-f", "concat", "-safe", "0",
                 "-i", str(concat_list),
                 "-c", "copy",
+                "-movflags", "+faststart",
                 str(output_path)
             ]
             self.run_cmd(cmd)
@@ -151,13 +240,26 @@ class VideoService:
             pass
     
     def get_audio_duration(self, path):
+        """
+        ffprobe duration of a local audio file. The pipeline measures each clip
+        while synthesizing and assemble_steps asks again, so results are memoized
+        per file version instead of forking ffprobe twice.
+        """
+        st = os.stat(path)
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        duration = self._audio_durations.get(key)
+        if duration is not None:
+            return duration
+
         out, _ = self.run_cmd([
             "ffprobe", "-v", "error",
             "-show_entries", "format=duration",
             "-of", "json", str(path)
         ])
         j = json.loads(out)
-        return float(j["format"]["duration"])
+        duration = float(j["format"]["duration"])
+        self._audio_durations[key] = duration
+        return duration
 
     def cut_segment(self, input_path, start, duration, output_path):
         end = start + duration
@@ -169,6 +271,7 @@ class VideoService:
             "-c:v", "libx264",
             "-preset", "ultrafast",
             "-crf", "23",
+            "-threads", str(FFMPEG_THREADS),
             "-an",
             str(output_path)
         ])
@@ -176,7 +279,12 @@ class VideoService:
     def freeze_to_duration(self, input_path, target_duration, output_path):
         current = self.get_duration(input_path)
         if current >= target_duration:
-            shutil.copy(input_path, output_path)
+            # A hard link moves no bytes at all; across filesystems shutil.copy
+            # falls back to an in-kernel sendfile copy on Linux
+            try:
+                os.link(input_path, output_path)
+            except OSError:
+                shutil.copy(input_path, output_path)
             return
 
         pad = target_duration - current
@@ -188,35 +296,42 @@ class VideoService:
             "-c:v", "libx264",
             "-preset", "ultrafast",
             "-crf", "23",
+            "-threads", str(FFMPEG_THREADS),
             "-an",
             str(output_path)
         ])
     
     def attach_audio(self, video_path, audio_path, output_path):
+        # Video is stream-copied; only the narration track is encoded
         self.run_cmd([
             "ffmpeg", "-y",
             "-i", str(video_path),
             "-i", str(audio_path),
             "-map", "0:v",
-        "-map", "1:a",
-        "-c:v", "copy",
-        "-c:a", "aac",
-        "-shortest",
-        str(output_path)
-    ])
-
-    def concat_clips(self, clips, output_path):
+            "-map", "1:a",
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-shortest",
+            "-movflags", "+faststart",
+            str(output_path)
+        ])
+
+    def concat_clips(self, clips, output_path, faststart=False):
         tmp = Path(tempfile.mkdtemp(prefix="final_concat_"))
         lst = tmp / "list.txt"
         lst.write_text("\n".join(
             [f"file '{Path(c).as_posix()}'" for c in clips]
         ), encoding="utf-8")
 
+        # Only deliverables need the moov atom up front for progressive playback
+        movflags = ["-movflags", "+faststart"] if faststart else []
+
         self.run_cmd([
             "ffmpeg", "-y",
             "-f", "concat", "-safe", "0",
             "-i", str(lst),
             "-c", "copy",
+            *movflags,
             str(output_path)
         ])
 
@@ -343,7 +458,7 @@ class VideoService:
             # ----------------------------
             # 7. Final concat
             # ----------------------------
-            self.concat_clips(step_clips, output_path)
+            self.concat_clips(step_clips, output_path, faststart=True)
 
         finally:
             shutil.rmtree(tmp, ignore_errors=True)
@@ -398,6 +513,7 @@ class VideoService:
             "-c:v", "libx264",
             "-preset", "veryfast",
             "-crf", "20",
+            "-threads", str(FFMPEG_THREADS),
             "-c:a", "aac",
             "-b:a", "192k",
             "-shortest",
@@ -405,13 +521,54 @@ class VideoService:
             str(output_path)
         ])
 
+    def scene_timestamps(self, video_path, threshold=0.3):
+        """
+        Returns sorted timestamps (seconds) where the picture changes by more than
+        'threshold', from a single decode pass over a downscaled copy of the video.
+        """
+        _, err = self.run_cmd([
+            "ffmpeg", "-hide_banner", "-nostats",
+            *_input_args(video_path),
+            "-an",
+            "-vf", f"scale=320:-2,select='gt(scene,{threshold})',showinfo",
+            "-f", "null", "-"
+        ])
+        return sorted(float(t) for t in re.findall(r"pts_time:\s*([0-9.]+)", err))
+
     def extract_frame(self, video_path, time_in_seconds, output_path):
         self.run_cmd([
             "ffmpeg", "-y",
             "-ss", f"{time_in_seconds:.3f}",
-            "-i", str(video_path),
+            *_input_args(video_path),
             "-frames:v", "1",
             "-q:v", "2",
             "-pix_fmt", "yuvj420p",
             str(output_path)
         ])
+
+    def extract_frames_batch(self, video_path, times_in_seconds, output_paths, batch_size=32, on_batch=None):
+        """
+        Extracts one frame per timestamp using a single ffmpeg process per batch.
+        Each timestamp is opened as its own input with an input-side seek, so
+        only the GOPs around the requested times are decoded.
+        on_batch(outputs) is called after each batch so callers can start
+        consuming frames while later batches are still being extracted.
+        """
+        for start in range(0, len(output_paths), batch_size):
+            times = times_in_seconds[start:start + batch_size]
+            outputs = output_paths[start:start + batch_size]
+
+            cmd = ["ffmpeg", "-y"]
+            for t in times:
+                cmd += ["-ss", f"{t:.3f}", *_input_args(video_path)]
+            for idx, out in enumerate(outputs):
+                cmd += [
+                    "-map", f"{idx}:v:0",
+                    "-frames:v", "1",
+                    "-q:v", "2",
+                    "-pix_fmt", "yuvj420p",
+                    str(out)
+                ]
+            self.run_cmd(cmd)
+            if on_batch:
+                on_batch(outputs)
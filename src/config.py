@@ -35,5 +35,38 @@ if raw_uri:
 else:
     VIDEO_BUCKET = os.getenv("VIDEO_BUCKET", DEFAULT_BUCKET)
 
+# GCS transfer tuning (chunk sizes must be a multiple of 256 KiB)
+GCS_DOWNLOAD_CHUNK_SIZE = int(os.getenv("GCS_DOWNLOAD_CHUNK_SIZE", str(32 * 1024 * 1024)))
+GCS_UPLOAD_CHUNK_SIZE = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(32 * 1024 * 1024)))
+GCS_WRITE_BUFFER_SIZE = int(os.getenv("GCS_WRITE_BUFFER_SIZE", str(1024 * 1024)))
+
+# Blobs larger than this are fetched as parallel byte-range slices
+GCS_SLICED_DOWNLOAD_THRESHOLD = int(os.getenv("GCS_SLICED_DOWNLOAD_THRESHOLD", str(16 * 1024 * 1024)))
+GCS_DOWNLOAD_WORKERS = int(os.getenv("GCS_DOWNLOAD_WORKERS", "8"))
+GCS_HTTP_POOL_SIZE = int(os.getenv("GCS_HTTP_POOL_SIZE", "32"))
+
+# Concurrent uploads when pushing many small assets (screenshots, voiceovers)
+GCS_UPLOAD_WORKERS = int(os.getenv("GCS_UPLOAD_WORKERS", "16"))
+
+# Concurrent Text-to-Speech requests per voiceover batch
+TTS_MAX_WORKERS = int(os.getenv("TTS_MAX_WORKERS", "8"))
+
+# Concurrent ffprobe processes when measuring or checking voiceover clips
+PROBE_MAX_WORKERS = int(os.getenv("PROBE_MAX_WORKERS", "8"))
+
+# Pipeline job queue (arq/Redis). When unset, jobs run in-process on the shared
+# pipeline_executor pool (see submit_pipeline_job).
+REDIS_URL = os.getenv("REDIS_URL")
+PIPELINE_JOB_TIMEOUT = int(os.getenv("PIPELINE_JOB_TIMEOUT", "3600"))
+
+# Videos processed concurrently per API process, and ffmpeg encoder threads per job
+PIPELINE_MAX_CONCURRENCY = int(os.getenv("PIPELINE_MAX_CONCURRENCY", "2"))
+FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", str(max(1, (os.cpu_count() or 1) // PIPELINE_MAX_CONCURRENCY))))
+
+# Snap guide screenshots to the nearest scene change within each segment.
+# Off by default: scene detection decodes the whole video once.
+GUIDE_SCENE_SNAP = os.getenv("GUIDE_SCENE_SNAP", "false").lower() in ("1", "true", "yes")
+GUIDE_SCENE_THRESHOLD = float(os.getenv("GUIDE_SCENE_THRESHOLD", "0.3"))
+
 # Other Global Configs
 FFMPEG_LOGLEVEL = os.getenv("FFMPEG_LOGLEVEL", "error")
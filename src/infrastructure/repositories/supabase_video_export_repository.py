@@ -1,5 +1,6 @@
 from typing import List, Optional
 from datetime import datetime, timezone
+from functools import lru_cache
 from src.domain.entities.video_export import VideoExportJob, VideoExportStatus
 from src.domain.repositories.video_export_repository import VideoExportRepository
 from src.infrastructure.supabase_client import supabase
@@ -80,3 +81,12 @@ class SupabaseVideoExportRepository(VideoExportRepository):
             created_at=data.get("created_at"),
             updated_at=data.get("updated_at")
         )
+
+
+@lru_cache(maxsize=1)
+def get_video_export_repository() -> SupabaseVideoExportRepository:
+    """
+    Process-wide export repository instance, shared by request dependencies
+    and export background tasks.
+    """
+    return SupabaseVideoExportRepository()
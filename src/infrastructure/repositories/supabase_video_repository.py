@@ -1,5 +1,6 @@
 import json
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional
 from src.domain.entities.video import Video
 from src.domain.repositories.video_repository import VideoRepository
@@ -199,3 +200,12 @@ class SupabaseVideoRepository(VideoRepository):
         except Exception as e:
             print(f"Update video repository error: {e}")
             raise
+
+
+@lru_cache(maxsize=1)
+def get_video_repository() -> SupabaseVideoRepository:
+    """
+    Process-wide repository instance, shared by request dependencies and
+    background jobs so they all reuse the same Supabase client.
+    """
+    return SupabaseVideoRepository()
@@ -1,10 +1,95 @@
 import os
+import base64
+import hashlib
+from datetime import timedelta
+from functools import lru_cache
+from urllib.parse import urlparse
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from google.api_core.exceptions import NotFound
+from requests.adapters import HTTPAdapter
 from .google_client import creds, PROJECT_ID
+from src.config import (
+    GCS_DOWNLOAD_CHUNK_SIZE,
+    GCS_UPLOAD_CHUNK_SIZE,
+    GCS_WRITE_BUFFER_SIZE,
+    GCS_SLICED_DOWNLOAD_THRESHOLD,
+    GCS_DOWNLOAD_WORKERS,
+    GCS_HTTP_POOL_SIZE
+)
 
 # Initialize the Storage client with shared credentials
 storage_client = storage.Client(credentials=creds, project=PROJECT_ID)
 
+# One AuthorizedSession for the process, with enough pooled connections for
+# sliced downloads and parallel uploads to reuse sockets instead of re-handshaking
+_http_adapter = HTTPAdapter(pool_connections=GCS_HTTP_POOL_SIZE, pool_maxsize=GCS_HTTP_POOL_SIZE)
+storage_client._http.mount("https://", _http_adapter)
+
+# GCS requires chunk sizes to be a multiple of 256 KiB
+_CHUNK_ALIGNMENT = 256 * 1024
+
+def _aligned_chunk_size(size):
+    return max(_CHUNK_ALIGNMENT, (size // _CHUNK_ALIGNMENT) * _CHUNK_ALIGNMENT)
+
+@lru_cache(maxsize=1024)
+def parse_gcs_uri(uri):
+    """
+    Splits a gs://bucket/blob or https://storage.googleapis.com/bucket/blob URI.
+    Returns (bucket_name, blob_name) or (None, None).
+    """
+    path = None
+    if uri.startswith("gs://"):
+        path = uri[5:]
+    elif uri.startswith("http"):
+        parsed = urlparse(uri)
+        if "storage.googleapis.com" in parsed.netloc:
+            path = parsed.path.lstrip("/")
+
+    if not path or "/" not in path:
+        return None, None
+
+    bucket_name, blob_name = path.split("/", 1)
+    return bucket_name, blob_name
+
+def _fadvise(fd, advice_name):
+    """Best-effort page cache hint; a no-op on platforms without posix_fadvise."""
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, advice)
+    except OSError:
+        pass
+
+def drop_page_cache(path):
+    """
+    Tells the kernel a large transient file's cached pages are no longer needed,
+    so multi-GB videos don't evict hotter data from the page cache.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        _fadvise(fd, "POSIX_FADV_DONTNEED")
+    finally:
+        os.close(fd)
+
+def public_url_for(bucket_name, blob_name):
+    """
+    The public URL upload_file returns for this blob; computed locally, no request.
+    """
+    return storage_client.bucket(bucket_name).blob(blob_name).public_url
+
+def file_md5(path):
+    """Base64 MD5 of a local file, in the same form GCS reports as md5_hash."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(GCS_WRITE_BUFFER_SIZE), b""):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode()
+
 def upload_file(bucket_name, source_file_path, destination_blob_name):
     """
     Uploads a file to the bucket.
@@ -12,11 +97,14 @@ def upload_file(bucket_name, source_file_path, destination_blob_name):
     try:
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(destination_blob_name)
+        # Large chunks keep the resumable upload from stalling on small round-trips
+        blob.chunk_size = _aligned_chunk_size(GCS_UPLOAD_CHUNK_SIZE)
 
         print(f"📤 Uploading {source_file_path} to {bucket_name}/{destination_blob_name}...")
         blob.upload_from_filename(source_file_path)
         print(f"✅ File uploaded successfully.")
-        
+        drop_page_cache(source_file_path)
+
         return blob.public_url
     except Exception as e:
         print(f"❌ Upload failed: {e}")
@@ -24,22 +112,128 @@ def upload_file(bucket_name, source_file_path, destination_blob_name):
 
 def download_file(bucket_name, source_blob_name, destination_file_path):
     """
-    Downloads a blob from the bucket.
+    Downloads a blob from the bucket. Bytes land in a .part file that is renamed
+    into place only once complete, so destination_file_path never holds a
+    preallocated or partially written file.
     """
+    part_path = f"{destination_file_path}.part"
     try:
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(source_blob_name)
+        blob.chunk_size = _aligned_chunk_size(GCS_DOWNLOAD_CHUNK_SIZE)
 
         # Create destination directory if it doesn't exist
         os.makedirs(os.path.dirname(os.path.abspath(destination_file_path)), exist_ok=True)
 
+        # Fetch metadata first so we know whether slicing is worth it
+        blob.reload()
+        size = blob.size or 0
+
         print(f"📥 Downloading {bucket_name}/{source_blob_name} to {destination_file_path}...")
-        blob.download_to_filename(destination_file_path)
+        if size > GCS_SLICED_DOWNLOAD_THRESHOLD:
+            # Large videos: fetch byte ranges concurrently into a preallocated file,
+            # one slice per worker so every worker has a range to pull. Round up to
+            # the alignment; rounding down would leave a small extra slice
+            slice_size = -(-size // (GCS_DOWNLOAD_WORKERS * _CHUNK_ALIGNMENT)) * _CHUNK_ALIGNMENT
+            transfer_manager.download_chunks_concurrently(
+                blob,
+                part_path,
+                chunk_size=slice_size,
+                worker_type=transfer_manager.THREAD,
+                max_workers=GCS_DOWNLOAD_WORKERS
+            )
+        else:
+            # Buffer local writes so each chunk lands in a few large syscalls
+            with open(part_path, "wb", buffering=GCS_WRITE_BUFFER_SIZE) as f:
+                # Reserve the full extent up front to avoid fragmentation
+                if size and hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, size)
+                _fadvise(f.fileno(), "POSIX_FADV_SEQUENTIAL")
+                blob.download_to_file(f)
+        os.replace(part_path, destination_file_path)
         print(f"✅ File downloaded successfully.")
-        
+
         return destination_file_path
     except Exception as e:
         print(f"❌ Download failed for {bucket_name}/{source_blob_name}: {e}")
+        # Don't leave a partial file behind
+        if os.path.exists(part_path):
+            os.remove(part_path)
         import traceback
         traceback.print_exc()
         return None
+
+def copy_file(bucket_name, source_blob_name, destination_blob_name):
+    """
+    Copies a blob within the bucket server-side; no bytes pass through this host.
+    """
+    try:
+        bucket = storage_client.bucket(bucket_name)
+        new_blob = bucket.copy_blob(bucket.blob(source_blob_name), bucket, destination_blob_name)
+        print(f"✅ Copied {bucket_name}/{source_blob_name} to {destination_blob_name} server-side.")
+        return new_blob.public_url
+    except Exception as e:
+        print(f"❌ Server-side copy failed: {e}")
+        return None
+
+def upload_text(bucket_name, text, destination_blob_name, content_type="text/plain; charset=utf-8"):
+    """
+    Uploads a small text payload directly from memory.
+    """
+    try:
+        blob = storage_client.bucket(bucket_name).blob(destination_blob_name)
+        blob.upload_from_string(text, content_type=content_type)
+        return blob.public_url
+    except Exception as e:
+        print(f"❌ Text upload failed for {bucket_name}/{destination_blob_name}: {e}")
+        return None
+
+def download_text(bucket_name, source_blob_name):
+    """
+    Returns a small text blob's contents, or None if it doesn't exist.
+    """
+    try:
+        return storage_client.bucket(bucket_name).blob(source_blob_name).download_as_text()
+    except NotFound:
+        return None
+    except Exception as e:
+        print(f"❌ Text download failed for {bucket_name}/{source_blob_name}: {e}")
+        return None
+
+def get_blob_md5(bucket_name, blob_name):
+    """
+    Returns the blob's base64 MD5 from a single metadata request, or None.
+    """
+    try:
+        blob = storage_client.bucket(bucket_name).get_blob(blob_name, fields="md5Hash")
+        return blob.md5_hash if blob else None
+    except Exception as e:
+        print(f"⚠️ Could not read metadata for {bucket_name}/{blob_name}: {e}")
+        return None
+
+def get_blob_size(bucket_name, blob_name):
+    """
+    Returns the blob's size in bytes from a single metadata request, or None.
+    """
+    try:
+        blob = storage_client.bucket(bucket_name).get_blob(blob_name, fields="size")
+        return blob.size if blob else None
+    except Exception as e:
+        print(f"⚠️ Could not read metadata for {bucket_name}/{blob_name}: {e}")
+        return None
+
+def generate_signed_url(bucket_name, blob_name, expiration_minutes=60):
+    """
+    Returns a V4 signed GET URL for the blob, so tools like ffmpeg can read it
+    directly over HTTPS (using range requests) instead of downloading it first.
+    """
+    try:
+        blob = storage_client.bucket(bucket_name).blob(blob_name)
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=timedelta(minutes=expiration_minutes),
+            method="GET"
+        )
+    except Exception as e:
+        print(f"❌ Signed URL generation failed for {bucket_name}/{blob_name}: {e}")
+        return None
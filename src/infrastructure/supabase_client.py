@@ -1,6 +1,7 @@
 import os
 from typing import Optional
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 from src.config import PROJECT_ROOT
@@ -17,4 +18,11 @@ if not url or not key:
 if not url or not key:
     raise ValueError(f"Supabase credentials not found in environment. Checked SUPABASE_URL and NEXT_PUBLIC_SUPABASE_URL. CWD: {os.getcwd()}")
 
-supabase: Client = create_client(url, key)
+# One HTTP/2 pool shared by PostgREST and auth, so concurrent repository and
+# get_user calls multiplex over a few connections instead of re-handshaking
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+supabase: Client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
@@ -1,18 +1,31 @@
 import os
 import json
 import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 from google.cloud import texttospeech
+from src.config import TTS_MAX_WORKERS
 
-def generate_voiceover(script_data, credentials, output_dir="voiceovers"):
+@lru_cache(maxsize=4)
+def get_tts_client(credentials):
     """
-    Convert script to AI voice using Google Text-to-Speech
+    One TextToSpeechClient per credentials object, so its gRPC channel (TLS and
+    auth) is reused across voiceover batches instead of rebuilt on every call.
+    """
+    return texttospeech.TextToSpeechClient(credentials=credentials)
+
+def generate_voiceover(script_data, credentials, output_dir="voiceovers", on_segment=None, max_workers=None):
+    """
+    Convert script to AI voice using Google Text-to-Speech.
+    on_segment, if given, is called with each audio entry as soon as its file is written.
+    max_workers caps concurrent TTS requests (defaults to TTS_MAX_WORKERS).
     """
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     
-    # Initialize TTS client with provided credentials
-    tts_client = texttospeech.TextToSpeechClient(credentials=credentials)
+    # Shared TTS client for the provided credentials
+    tts_client = get_tts_client(credentials)
     
     voice = texttospeech.VoiceSelectionParams(
         language_code="en-US",
@@ -28,43 +41,52 @@ def generate_voiceover(script_data, credentials, output_dir="voiceovers"):
     
 
     audio_files = []
-    
-    for i, entry in enumerate(script_data):
-        # Generate unique ID for this segment if not present
+
+    # Generate unique IDs up front so every segment is addressable before synthesis
+    for entry in script_data:
         if 'id' not in entry:
             entry['id'] = uuid.uuid4().hex[:8]
-            
+
+    def synthesize(indexed_entry):
+        i, entry = indexed_entry
         print(f"🎤 Generating voiceover {i+1}/{len(script_data)} ({entry['id']})...")
-        
         synthesis_input = texttospeech.SynthesisInput(text=entry['voiceover_text'])
-        
-        response = tts_client.synthesize_speech(
+        return tts_client.synthesize_speech(
             input=synthesis_input,
             voice=voice,
             audio_config=audio_config
         )
-        
-        timestamp_clean = entry['timestamp'].replace(':', '')
-        filename = os.path.join(output_dir, f"narration_{i+1:02d}_{timestamp_clean}.mp3")
-        
-        with open(filename, "wb") as out:
-            out.write(response.audio_content)
-        
-        # Calculate estimating duration based on response byte size for MP3 (approximate)
-        # MP3 24khz/48kbps approx. 
-        # Better: let pipeline service fill this in accurately.
-        
-        audio_files.append({
-            "id": entry['id'],
-            "filename": filename,
-            "timestamp": entry['timestamp'],
-            "duration": entry.get('pause_duration', 1.5),
-            "text": entry['voiceover_text']
-        })
 
-        
-    
-    
+    # Lines are independent network round-trips, so issue them concurrently.
+    # map() yields in script order, so files are still written and reported in sequence.
+    # No more threads than lines; short scripts don't pay for an idle pool
+    workers = max(1, min(max_workers or TTS_MAX_WORKERS, len(script_data)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        responses = executor.map(synthesize, enumerate(script_data))
+
+        for i, (entry, response) in enumerate(zip(script_data, responses)):
+            timestamp_clean = entry['timestamp'].replace(':', '')
+            filename = os.path.join(output_dir, f"narration_{i+1:02d}_{timestamp_clean}.mp3")
+
+            with open(filename, "wb") as out:
+                out.write(response.audio_content)
+
+            # Calculate estimating duration based on response byte size for MP3 (approximate)
+            # MP3 24khz/48kbps approx. 
+            # Better: let pipeline service fill this in accurately.
+
+            audio_entry = {
+                "id": entry['id'],
+                "filename": filename,
+                "timestamp": entry['timestamp'],
+                "duration": entry.get('pause_duration', 1.5),
+                "text": entry['voiceover_text']
+            }
+            audio_files.append(audio_entry)
+
+            if on_segment:
+                on_segment(audio_entry)
+
     # Save metadata
     metadata_path = os.path.join(output_dir, "metadata.json")
     with open(metadata_path, "w") as f:
@@ -0,0 +1,22 @@
+"""
+arq worker that runs the narration pipeline outside the API process.
+
+Start one worker per core with:
+    arq src.worker.WorkerSettings
+"""
+from arq.connections import RedisSettings
+
+from src.config import REDIS_URL, PIPELINE_JOB_TIMEOUT
+from src.api.v1.endpoints.videos import run_pipeline_background
+
+
+async def run_pipeline(ctx, video_id: str, video_uri: str, user_id: str, title: str, user_ip: str = "0.0.0.0", user_country: str = "unknown"):
+    await run_pipeline_background(video_id, video_uri, user_id, title, user_ip, user_country)
+
+
+class WorkerSettings:
+    functions = [run_pipeline]
+    redis_settings = RedisSettings.from_dsn(REDIS_URL or "redis://localhost:6379")
+    # One pipeline per worker process; scale by running more workers
+    max_jobs = 1
+    job_timeout = PIPELINE_JOB_TIMEOUT
@@ -0,0 +1,95 @@
+import os
+import sys
+
+# Add the project root (one level up from 'tests') to sys.path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.application import document_service
+from src.application.document_service import DocumentGenerationService
+from src.domain.entities.video import Video
+
+
+class InMemoryVideoRepository:
+    def __init__(self, video):
+        self.video = video
+        self.updates = []
+
+    def get_by_id(self, video_id):
+        return self.video
+
+    def update(self, video_id, existing_video=None, **kwargs):
+        self.updates.append(kwargs)
+        for key, value in kwargs.items():
+            setattr(self.video, key, value)
+        return self.video
+
+
+class FakeVideoService:
+    def extract_frames_batch(self, video_path, times, output_paths, batch_size=32, on_batch=None):
+        for path in output_paths:
+            path.write_bytes(b"jpeg")
+        if on_batch:
+            on_batch(output_paths)
+
+    def extract_frame(self, video_path, time_in_seconds, output_path):
+        output_path.write_bytes(b"jpeg")
+
+
+def _public_url(bucket_name, blob_name):
+    return f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
+
+
+def test_failed_screenshot_upload_is_retried_on_next_call(monkeypatch, tmp_path):
+    script = [
+        {"id": "seg1", "voiceover_text": "Open the dashboard.", "ui_element": "Dashboard", "user_action": "Open", "narration_start": 0.0, "audio_duration": 2.0},
+        {"id": "seg2", "voiceover_text": "Click save.", "ui_element": "Save", "user_action": "Save", "narration_start": 2.5, "audio_duration": 1.5},
+    ]
+    video = Video(
+        id="vid1",
+        created_by="user1",
+        title="Demo",
+        video_data={"processed_video_url": str(tmp_path / "final.mp4"), "script": script},
+    )
+    repo = InMemoryVideoRepository(video)
+
+    failing = {"seg2"}
+
+    def fake_upload_file(bucket_name, source_file_path, destination_blob_name):
+        if any(seg_id in destination_blob_name for seg_id in failing):
+            return None
+        return _public_url(bucket_name, destination_blob_name)
+
+    monkeypatch.setattr(document_service, "VideoService", FakeVideoService)
+    monkeypatch.setattr(document_service, "upload_file", fake_upload_file)
+    monkeypatch.setattr(document_service, "public_url_for", _public_url)
+    monkeypatch.setattr(document_service, "_frame_scratch_root", lambda: str(tmp_path))
+
+    service = DocumentGenerationService(repo, gemini_client=None)
+    guide_calls = []
+
+    def fake_guide(video_id, steps, title=None):
+        guide_calls.append([s["segment_id"] for s in steps])
+        return "# Demo guide"
+
+    monkeypatch.setattr(service, "generate_ai_markdown_guide", fake_guide)
+
+    # First call: seg2's upload fails, so the guide is incomplete and not marked current
+    first = service.generate_guide("vid1")
+    assert set(first["images"]) == {"seg1"}
+    assert first["script_hash"] is None
+
+    # Second call with the same script regenerates and fills in the missing screenshot
+    failing.clear()
+    second = service.generate_guide("vid1")
+    assert set(second["images"]) == {"seg1", "seg2"}
+    assert [s["segment_id"] for s in second["steps"]] == ["seg1", "seg2"]
+    assert second["script_hash"]
+    assert guide_calls[-1] == ["seg1", "seg2"]
+
+    # Third call: everything is in place, so the stored guide is reused as-is
+    calls_before = len(guide_calls)
+    third = service.generate_guide("vid1")
+    assert third is video.documentation
+    assert len(guide_calls) == calls_before